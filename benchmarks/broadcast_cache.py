@@ -0,0 +1,32 @@
+# liveBroadcasts.list calls for a startup (live id, chat id and status lookups) and for a burst of concurrent
+# callers on a stale cache, against a fake client with a 200 ms round trip.
+# Run from the repo root: python -m benchmarks.broadcast_cache
+import threading
+import time
+from types import SimpleNamespace
+from lib.yt_api import QuotaBudget, YouTubeClient
+from benchmarks.fake_youtube import FakeLiveBroadcasts, FakeYouTube
+
+
+def main():
+    client = YouTubeClient(SimpleNamespace(channel_id="fake", youtube_broadcast_cache_ttl=1), youtube=FakeYouTube(),
+                           quota=QuotaBudget(state_file=None))
+    start = time.perf_counter()
+    client.get_live_id(), client.get_live_chat_id(), client.get_broadcast_status()
+    print(f"Startup: {FakeLiveBroadcasts.calls} liveBroadcasts.list call(s), {time.perf_counter() - start:.2f}s")
+
+    time.sleep(1.1)  # Let the cache go stale
+    FakeLiveBroadcasts.calls = 0
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client.get_live_chat_id) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    waited = time.perf_counter() - start
+    time.sleep(0.3)  # Background refresh
+    print(f"10 concurrent callers on a stale cache: {FakeLiveBroadcasts.calls} call(s), callers done in {waited:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
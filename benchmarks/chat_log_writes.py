@@ -0,0 +1,55 @@
+# Chat log write cost against session length: the old rewrite of a whole JSON array per flush vs appending JSON Lines.
+# Run from the repo root: python -m benchmarks.chat_log_writes [--batch 10]
+import argparse
+import json
+import os
+import tempfile
+import time
+from lib.chat_log import ChatLogWriter
+
+ENTRY = {"author": "bench", "timestamp": "2023-09-18T14:33:30Z", "message": "hopii what is the weather like on mars",
+         "response": "Chilly, with a chance of dust storms.", "relevant": True}
+
+
+def rewrite_json(path, batch):
+    # The previous save_messages_to_file: read everything, append, rewrite everything
+    try:
+        with open(path, 'r') as f:
+            messages = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        messages = []
+    messages.extend(batch)
+    with open(path, 'w') as f:
+        json.dump(messages, f, indent=4, default=str)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Chat log write cost against session length")
+    arg_parser.add_argument("--batch", type=int, default=10, help="Entries per flush")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for session_length in (500, 2000, 5000):
+            batches = session_length // args.batch
+
+            legacy_path = os.path.join(directory, f"{session_length}.json")
+            start = time.perf_counter()
+            for _ in range(batches):
+                rewrite_json(legacy_path, [ENTRY] * args.batch)
+            legacy_time = time.perf_counter() - start
+
+            writer = ChatLogWriter(os.path.join(directory, f"{session_length}.jsonl"), fsync_policy="flush")
+            start = time.perf_counter()
+            for _ in range(batches):
+                for _ in range(args.batch):
+                    writer.write(ENTRY)
+                writer.flush()
+            writer.close()
+            jsonl_time = time.perf_counter() - start
+
+            print(f"{session_length:>6} entries: rewrite JSON {legacy_time:8.3f}s total, {legacy_time / batches * 1000:8.3f} ms/flush | "
+                  f"append JSONL {jsonl_time:6.3f}s total, {jsonl_time / batches * 1000:6.3f} ms/flush")
+
+
+if __name__ == '__main__':
+    main()
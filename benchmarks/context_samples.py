@@ -0,0 +1,39 @@
+import time
+from types import SimpleNamespace
+
+SAMPLE_TEXTS = (
+    "hopii what do you think about the new starship launch?",
+    "hey hopii how is it going",
+    "lol that was close",
+    "Did anyone see the booster catch at Starbase yesterday",
+    "hoppy can you tell me where the raptor engines are built",
+    "gg",
+)
+SAMPLES = [{"author": "viewer", "timestamp": "2023-09-18T14:33:30Z", "message": text} for text in SAMPLE_TEXTS] * 50
+
+
+def context_parser_config(**overrides):
+    """The ContextParser settings the benchmarks need, with config.py's defaults."""
+    config = SimpleNamespace(
+        context_parser_greeting_words=["hi", "hello", "hey"],
+        context_parser_question_starts=["what", "why", "how", "when", "who", "where"],
+        context_parser_short_message_threshold=3,
+        context_parser_keywords=["hopii", "hoppi", "hoppy", "hopi"],
+        context_parser_author_allowlist=[],
+        context_parser_greeting_limit=3,
+        context_parser_greeting_time_limit=5,
+        context_parser_reply_time_limit=30,
+        context_parser_batch_size=64,
+        context_parser_n_process=1,
+        context_parser_history_size=10,
+    )
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def per_message_ms(callback, samples=SAMPLES):
+    start = time.perf_counter()
+    for sample in samples:
+        callback(sample)
+    return (time.perf_counter() - start) / len(samples) * 1000
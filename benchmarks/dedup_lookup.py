@@ -0,0 +1,53 @@
+# Dedup cost per message against history size, the old deque + MD5 hex digests vs BoundedSet + blake2b keys.
+# Run from the repo root: python -m benchmarks.dedup_lookup
+import hashlib
+import time
+from collections import deque
+from lib.dedup import BoundedSet
+
+
+def md5_hex(author, message):
+    hasher = hashlib.md5()
+    hasher.update(author.encode())
+    hasher.update(message.encode())
+    return hasher.hexdigest()
+
+
+def blake2b_64(author, message):
+    hasher = hashlib.blake2b(digest_size=8)
+    hasher.update(author.encode())
+    hasher.update(b"\0")
+    hasher.update(message.encode())
+    return int.from_bytes(hasher.digest(), "little")
+
+
+def main():
+    messages = [(f"viewer{i % 500}", f"chat message number {i}") for i in range(5000)]
+    for history in (50, 1000, 10000, 100000):
+        # Both start full, so every lookup runs against a history of this size
+        fillers = [(f"filler{i}", "earlier message") for i in range(history)]
+
+        seen = deque((md5_hex(*filler) for filler in fillers), maxlen=history)
+        # The linear scan is too slow to run every message at the larger sizes
+        sample = messages if history <= 1000 else messages[:500]
+        start = time.perf_counter()
+        for author, message in sample:
+            key = md5_hex(author, message)
+            if key not in seen:
+                seen.append(key)
+        old = (time.perf_counter() - start) / len(sample) * 1e6
+
+        seen = BoundedSet(history)
+        for filler in fillers:
+            seen.add(blake2b_64(*filler))
+        start = time.perf_counter()
+        for author, message in messages:
+            key = blake2b_64(author, message)
+            if key not in seen:
+                seen.add(key)
+        new = (time.perf_counter() - start) / len(messages) * 1e6
+        print(f"history {history:>6}: deque + md5 {old:9.2f} us/message | BoundedSet + blake2b {new:5.2f} us/message")
+
+
+if __name__ == '__main__':
+    main()
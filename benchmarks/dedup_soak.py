@@ -0,0 +1,56 @@
+# Memory and add cost of the seen id store over a simulated 12h stream, unbounded set vs BoundedSet.
+# Run from the repo root: python -m benchmarks.dedup_soak [--ids 3000000] [--maxlen 100000] [--max-age 3600]
+import argparse
+import sys
+import time
+from lib.dedup import BoundedSet, compact_id
+
+
+def set_memory(items):
+    return sys.getsizeof(items) + sum(sys.getsizeof(item) for item in items)
+
+
+def soak_id(i):
+    # Shaped like the API's ids (~75 characters)
+    return f"LCC.CjgKDQoLbWhKUnpRc3pH{i:052x}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Seen id store memory over a simulated 12h stream")
+    arg_parser.add_argument("--ids", type=int, default=3_000_000)
+    arg_parser.add_argument("--maxlen", type=int, default=100_000)
+    arg_parser.add_argument("--max-age", type=float, default=3600)
+    args = arg_parser.parse_args()
+
+    # Spread evenly over a 12 hour stream on a simulated clock
+    stream_seconds = 12 * 3600
+    now = [0.0]
+    unbounded = set()
+    bounded = BoundedSet(args.maxlen, max_age=args.max_age, key=compact_id, clock=lambda: now[0])
+    checkpoints = {args.ids * step // 4 for step in range(1, 5)}
+    unbounded_time = bounded_time = 0.0
+    for i in range(1, args.ids + 1):
+        now[0] = i * stream_seconds / args.ids
+        message_id = soak_id(i)
+
+        start = time.perf_counter()
+        if message_id not in unbounded:
+            unbounded.add(message_id)
+        unbounded_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if message_id not in bounded:
+            bounded.add(message_id)
+        bounded_time += time.perf_counter() - start
+
+        if i in checkpoints:
+            print(f"{i:>9} ids, {now[0] / 3600:4.1f}h: set {len(unbounded):>9} ids {set_memory(unbounded) / 2 ** 20:7.1f} MiB | "
+                  f"BoundedSet {len(bounded):>7} ids {bounded.memory_usage() / 2 ** 20:5.1f} MiB")
+    print(f"per id: set {unbounded_time / args.ids * 1e6:.2f} us, BoundedSet {bounded_time / args.ids * 1e6:.2f} us")
+
+    # Every recent id is still caught, ids older than max_age are forgotten
+    print(f"most recent id still seen: {soak_id(args.ids) in bounded}, first id still seen: {soak_id(1) in bounded}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import time
+
+
+class FakeRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        return self.response
+
+
+class FakeLiveChatMessages:
+    def list(self, **kwargs):
+        return FakeRequest({'items': [], 'pollingIntervalMillis': 5000})
+
+
+class FakeLiveBroadcasts:
+    calls = 0
+
+    def list(self, **kwargs):
+        FakeLiveBroadcasts.calls += 1
+        time.sleep(0.2)  # Round trip
+        return FakeRequest({'items': [{'id': 'live', 'snippet': {'liveChatId': 'chat'}, 'status': {'lifeCycleStatus': 'live'}}]})
+
+
+class FakeYouTube:
+    """Stands in for the googleapiclient resource, passed to YouTubeClient(youtube=...)."""
+
+    def liveChatMessages(self):
+        return FakeLiveChatMessages()
+
+    def liveBroadcasts(self):
+        return FakeLiveBroadcasts()
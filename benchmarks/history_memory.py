@@ -0,0 +1,23 @@
+# Memory retained per context history message, a full Message vs the HistoryRecord kept now.
+# Run from the repo root: python -m benchmarks.history_memory
+import tracemalloc
+import spacy
+from lib.context_parsing import ContextParser, HistoryRecord, Message
+from benchmarks.context_samples import SAMPLES, context_parser_config
+
+
+def main():
+    config = context_parser_config()
+    nlp = spacy.load(ContextParser.MODEL_NAME, disable=ContextParser.DISABLED_PIPES)
+    for label, build in (("Message", lambda sample: Message(config, sample, nlp)),
+                         ("HistoryRecord", lambda sample: HistoryRecord.from_message(Message(config, sample, nlp)))):
+        tracemalloc.start()
+        retained = [build(sample) for sample in SAMPLES]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>13}: {size / len(retained):,.0f} bytes per retained message")
+        del retained
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Message latency (publish time to queued), CPU and process memory of the innertube chat fetcher.
+# Run from the repo root:
+#   python -m benchmarks.innertube_latency stub        against a local stub server that serves fake chat
+#   python -m benchmarks.innertube_latency <live_id>   against a real stream
+# Memory is only reported if psutil is installed.
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from chat_fetchers.yt_innertube_chat import YoutubeInnertubeChat
+from lib.logger import logger
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def text_message_action(number):
+    return {'addChatItemAction': {'item': {'liveChatTextMessageRenderer': {
+        'id': f"stub-{number}", 'timestampUsec': str(int(time.time() * 1e6)),
+        'authorName': {'simpleText': f"viewer{number % 20}"},
+        'message': {'runs': [{'text': f"stub message {number} "}, {'emoji': {'emojiId': "\N{WAVING HAND SIGN}"}}]}}}}}
+
+
+class StubYouTube(BaseHTTPRequestHandler):
+    sent = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        initial_data = {'contents': {'liveChatRenderer': {
+            'continuations': [{'invalidationContinuationData': {'continuation': "c0", 'timeoutMs': 1000}}],
+            'actions': [text_message_action(-1)]}}}
+        page = (f'<script>ytcfg.set({{"INNERTUBE_API_KEY":"stub-key","INNERTUBE_CONTEXT":{{"client":{{}}}}}});</script>'
+                f'<script>window["ytInitialData"] = {json.dumps(initial_data)};</script>')
+        self._reply("text/html", page.encode())
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        # A few messages per poll, like a busy chat
+        actions = [text_message_action(StubYouTube.sent + i) for i in range(3)]
+        StubYouTube.sent += 3
+        body = {'continuationContents': {'liveChatContinuation': {
+            'continuations': [{'timedContinuationData': {'continuation': f"c{StubYouTube.sent}", 'timeoutMs': 1000}}],
+            'actions': actions}}}
+        self._reply("application/json", json.dumps(body).encode())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Innertube chat fetcher latency and resource use")
+    arg_parser.add_argument("live_id", help="A live video id, or 'stub' for the local stub server")
+    arg_parser.add_argument("--seconds", type=float, default=None, help="Defaults to 10 for the stub, 30 otherwise")
+    args = arg_parser.parse_args()
+
+    config = SimpleNamespace(bot_display_name=None, chat_fetcher_queue_size=1000, chat_fetcher_seen_ids_size=100000,
+                             chat_fetcher_seen_ids_max_age=3600, chat_fetcher_ytinnertube_max_idle_interval=5,
+                             chat_fetcher_ytinnertube_max_backoff_interval=60)
+    logger.setLevel(logging.INFO)
+
+    server = None
+    if args.live_id == "stub":
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubYouTube)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        chat = YoutubeInnertubeChat(config, "stub", base_url=f"http://127.0.0.1:{server.server_port}")
+        seconds = args.seconds or 10
+    else:
+        chat = YoutubeInnertubeChat(config, args.live_id)
+        seconds = args.seconds or 30
+
+    chat.start_threaded()
+    received = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        while not chat.message_queue.empty():
+            chat.message_queue.get()
+            received += 1
+        time.sleep(0.1)
+    cpu = time.process_time() / (time.perf_counter() - start)
+    chat.stop()
+    if server:
+        server.shutdown()
+
+    stats = chat.poll_scheduler.get_stats()
+    memory = f"{psutil.Process().memory_info().rss / 2 ** 20:.0f} MiB" if psutil else "n/a (no psutil)"
+    median = f"{stats['latency_median'] * 1000:.0f}" if stats['latency_median'] is not None else "n/a"
+    print(f"{received} messages in {seconds:g}s over {stats['polls']} polls, latency median {median} ms, "
+          f"max {stats['latency_max'] * 1000:.0f} ms, process RSS {memory}, CPU {cpu * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
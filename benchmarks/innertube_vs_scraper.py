@@ -0,0 +1,106 @@
+# The innertube fetcher against the Selenium scraper on the same live stream, each in its own process at the same
+# time: messages, memory (the process and everything it started, so Chrome for the scraper), CPU, latency from
+# the message timestamp and, for messages both received, how much earlier the innertube fetcher had them.
+# The scraper's timestamps are only exact when the page exposes timestampUsec, otherwise they're the displayed minute.
+# Needs Chrome, psutil and a live stream with some chat.
+# Run from the repo root: python -m benchmarks.innertube_vs_scraper <live_id> [--seconds 120] [--mode push] [--profile lean]
+import argparse
+import logging
+import multiprocessing
+import queue
+import time
+from types import SimpleNamespace
+import psutil
+from lib.timestamps import timestamp_to_epoch
+from lib.logger import logger
+
+
+def make_config(args):
+    return SimpleNamespace(bot_display_name=None, chat_fetcher_queue_size=10000, chat_fetcher_seen_ids_size=100000,
+                           chat_fetcher_seen_ids_max_age=3600, chat_fetcher_ytinnertube_max_idle_interval=5,
+                           chat_fetcher_ytinnertube_max_backoff_interval=60,
+                           chat_fetcher_ytscraper_mode=args.mode, chat_fetcher_ytscraper_drain_interval=1.0,
+                           chat_fetcher_ytscraper_profile=args.profile, chat_fetcher_ytscraper_user_data_dir='chrome_profile_bench',
+                           chat_fetcher_ytscraper_humanize=False, chat_fetcher_ytscraper_humanize_interval=10)
+
+
+def process_tree_usage():
+    """(resident bytes, CPU seconds) of this process and everything it started."""
+    processes = [psutil.Process()]
+    processes += processes[0].children(recursive=True)
+    rss = cpu = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+            cpu += sum(process.cpu_times()[:2])
+        except psutil.Error:
+            pass
+    return rss, cpu
+
+
+def run_fetcher(name, args, results):
+    logger.setLevel(logging.WARNING)
+    config = make_config(args)
+    if name == "innertube":
+        from chat_fetchers.yt_innertube_chat import YoutubeInnertubeChat
+        chat = YoutubeInnertubeChat(config, args.live_id)
+    else:
+        from chat_fetchers.yt_chat_scraper import YoutubeChatScraper
+        chat = YoutubeChatScraper(config, args.live_id)
+
+    chat.start_threaded()
+    _, cpu_start = process_tree_usage()
+    start = time.perf_counter()
+    arrivals = []  # (author, text, timestamp, arrival), both epoch seconds
+    while time.perf_counter() - start < args.seconds:
+        try:
+            message = chat.message_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        arrivals.append((message['author'], " ".join(message['message'].split()),
+                         timestamp_to_epoch(message['timestamp']), time.time()))
+    rss, cpu_end = process_tree_usage()
+    elapsed = time.perf_counter() - start
+    chat.stop()
+    results.put((name, {'arrivals': arrivals, 'rss': rss, 'cpu': (cpu_end - cpu_start) / elapsed}))
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else float('nan')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Innertube fetcher vs Selenium scraper on one live stream")
+    arg_parser.add_argument("live_id")
+    arg_parser.add_argument("--seconds", type=float, default=120)
+    arg_parser.add_argument("--mode", choices=("poll", "push"), default="push", help="Scraper mode")
+    arg_parser.add_argument("--profile", choices=("full", "lean"), default="lean", help="Scraper Chrome profile")
+    args = arg_parser.parse_args()
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_fetcher, args=(name, args, results)) for name in ("innertube", "scraper")]
+    for worker in workers:
+        worker.start()
+    # Collect before joining, a worker can't exit while its result is still in the pipe
+    measured = dict(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    for name, result in measured.items():
+        arrivals = result['arrivals']
+        latency = median(arrival - timestamp for _, _, timestamp, arrival in arrivals)
+        print(f"{name:>9}: {len(arrivals):5d} messages, memory {result['rss'] / 2 ** 20:6.0f} MiB, "
+              f"CPU {result['cpu'] * 100:5.1f}%, latency from timestamp median {latency:5.2f}s")
+
+    # Same message, both fetchers: positive means the innertube fetcher had it first
+    scraper_arrivals = {}
+    for author, text, _, arrival in measured['scraper']['arrivals']:
+        scraper_arrivals.setdefault((author, text), arrival)
+    differences = [scraper_arrivals[(author, text)] - arrival
+                   for author, text, _, arrival in measured['innertube']['arrivals'] if (author, text) in scraper_arrivals]
+    print(f"{len(differences)} messages seen by both, innertube ahead by median {median(differences):.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Per message cost of a disabled verbose log line with an expensive argument, f-string vs LazyLog.
+# Run from the repo root: python -m benchmarks.lazy_log
+import logging
+import time
+from lib.logger import logger, LazyLog
+
+
+class FakeMessage:
+    """Stands in for context_parsing.Message, whose get_properties evaluates every property."""
+    text = "hopii what do you think about the new starship launch " * 2
+
+    def get_properties(self):
+        return {
+            "tokens": self.text.split(),
+            "entities": [word for word in self.text.split() if word.istitle()],
+            "upper": self.text.upper(),
+            "counts": {word: self.text.count(word) for word in set(self.text.split())},
+        }
+
+
+def main():
+    logger.setLevel(logging.INFO)
+    message = FakeMessage()
+    iterations = 20000
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        logger.verbose(f"Message properties: {message.get_properties()}")
+    eager = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        logger.verbose("Message properties: %s", LazyLog(message.get_properties))
+    lazy = (time.perf_counter() - start) / iterations * 1e6
+
+    print(f"At INFO: f-string {eager:.2f} us/message, LazyLog {lazy:.2f} us/message")
+
+
+if __name__ == '__main__':
+    main()
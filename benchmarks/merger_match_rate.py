@@ -0,0 +1,36 @@
+# Cross-source match rate of ChatMerger on recorded chat logs, one log per source, interleaved by timestamp.
+# Record them with record_sources = true in [ChatLogging], which writes <chat log>.<source>.jsonl next to the log.
+# Run from the repo root:
+#   python -m benchmarks.merger_match_rate chat_logs/<session>.youtube_api.jsonl chat_logs/<session>.youtube_scraper.jsonl [--window 120]
+import argparse
+import logging
+from types import SimpleNamespace
+from lib.chat_log import read_chat_log
+from lib.chat_merger import ChatMerger
+from lib.timestamps import timestamp_to_epoch
+from lib.logger import logger
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="ChatMerger cross-source match rate on recorded logs")
+    arg_parser.add_argument("logs", nargs="+")
+    arg_parser.add_argument("--window", type=float, default=120)
+    args = arg_parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    merger = ChatMerger(SimpleNamespace(chatmerger_message_history=10000, chatmerger_match_window=args.window,
+                                        chatmerger_reorder_delay=0), [])
+    entries = []
+    for path in args.logs:
+        for entry in read_chat_log(path):
+            entries.append((timestamp_to_epoch(entry['timestamp']), path, entry))
+    entries.sort(key=lambda item: item[0])
+    for timestamp, path, entry in entries:
+        merger._expire(timestamp)
+        merger.merge({'author': entry['author'], 'timestamp': entry['timestamp'], 'message': entry['message'],
+                      'id': entry.get('id')}, path, now=timestamp, timestamp=timestamp)
+    merger.log_stats()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Merge throughput with 1-8 synthetic sources generating as fast as the merger accepts messages.
+# Run from the repo root: python -m benchmarks.merger_throughput [--seconds 3]
+import argparse
+import logging
+import time
+from types import SimpleNamespace
+from chat_fetchers.synthetic import SyntheticChat
+from lib.chat_merger import ChatMerger
+from lib.logger import logger
+
+
+def throughput(source_count, seconds):
+    config = SimpleNamespace(chatmerger_message_history=10000, chatmerger_match_window=120, chatmerger_reorder_delay=0,
+                             chat_fetcher_queue_size=1000, chat_fetcher_synthetic_rate=0, chat_fetcher_synthetic_authors=50)
+    sources = [SyntheticChat(config, seed=i) for i in range(source_count)]
+    merger = ChatMerger(config, sources)
+    for source in sources:
+        source.start_threaded()
+    emitted = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        emitted += len(merger.wait_for_messages(timeout=1.0))
+    elapsed = time.perf_counter() - start
+    for source in sources:
+        source.stop()
+    print(f"{source_count} sources: {emitted / elapsed:9.0f} messages/s merged")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="ChatMerger throughput with synthetic sources")
+    arg_parser.add_argument("--seconds", type=float, default=3)
+    args = arg_parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    for source_count in (1, 2, 4, 8):
+        throughput(source_count, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
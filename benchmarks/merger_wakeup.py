@@ -0,0 +1,55 @@
+# Idle CPU and wake-up latency of the fetch loop, busy spinning on get_unique_messages vs wait_for_messages.
+# Run from the repo root: python -m benchmarks.merger_wakeup
+import logging
+import queue
+import threading
+import time
+from types import SimpleNamespace
+from lib.chat_merger import ChatMerger
+from lib.logger import logger
+
+
+def measure(mode, idle_seconds=2.0, messages=20, gap=0.05):
+    fetcher = SimpleNamespace(source_name="bench", message_queue=queue.Queue(), message_event=threading.Event())
+    # No reorder hold, this measures how fast the loop notices a message
+    merger = ChatMerger(SimpleNamespace(chatmerger_message_history=50, chatmerger_match_window=120,
+                                        chatmerger_reorder_delay=0), [fetcher])
+    stop = threading.Event()
+    latencies = []
+
+    def loop():
+        while not stop.is_set():
+            if mode == "spin":
+                received = merger.get_unique_messages()
+            else:
+                received = merger.wait_for_messages(timeout=1.0)
+            now = time.perf_counter()
+            latencies.extend(now - message['sent'] for message in received)
+
+    thread = threading.Thread(target=loop)
+    cpu_start = time.process_time()
+    thread.start()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_start) / idle_seconds
+
+    for i in range(messages):
+        fetcher.message_queue.put({'author': 'bench', 'timestamp': '2023-09-18T14:33:30Z', 'message': f'message {i}', 'sent': time.perf_counter()})
+        fetcher.message_event.set()
+        time.sleep(gap)
+
+    stop.set()
+    merger.wake()
+    thread.join()
+    latencies.sort()
+    print(f"{mode:>5}: idle CPU {idle_cpu * 100:6.1f}% of a core, "
+          f"wake-up latency median {latencies[len(latencies) // 2] * 1000:.3f} ms, max {latencies[-1] * 1000:.3f} ms")
+
+
+def main():
+    logger.setLevel(logging.INFO)
+    measure("spin")
+    measure("event")
+
+
+if __name__ == '__main__':
+    main()
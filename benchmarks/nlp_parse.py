@@ -0,0 +1,20 @@
+# Per message parse cost: the full spaCy pipeline, the trimmed one ContextParser loads, and building a Message.
+# Run from the repo root: python -m benchmarks.nlp_parse
+import spacy
+from lib.context_parsing import ContextParser, Message
+from benchmarks.context_samples import context_parser_config, per_message_ms
+
+
+def main():
+    config = context_parser_config()
+    full_nlp = spacy.load(ContextParser.MODEL_NAME)
+    trimmed_nlp = spacy.load(ContextParser.MODEL_NAME, disable=ContextParser.DISABLED_PIPES)
+    per_message_ms(lambda sample: trimmed_nlp(sample["message"]))  # Warm up
+
+    print(f"nlp() full pipeline:       {per_message_ms(lambda sample: full_nlp(sample['message'])):.3f} ms/message")
+    print(f"nlp() trimmed pipeline:    {per_message_ms(lambda sample: trimmed_nlp(sample['message'])):.3f} ms/message")
+    print(f"Message() + is_greeting:   {per_message_ms(lambda sample: Message(config, sample, trimmed_nlp).is_greeting):.3f} ms/message")
+
+
+if __name__ == '__main__':
+    main()
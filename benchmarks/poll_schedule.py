@@ -0,0 +1,41 @@
+# Polls and message latency for a simulated chat over 10 minutes: the old fixed 60s sleep, always polling at
+# the server interval, and PollScheduler.
+# Run from the repo root: python -m benchmarks.poll_schedule
+import random
+from lib.poll_scheduler import PollScheduler
+
+SERVER_INTERVAL = 5.0
+
+
+def simulate(arrivals, next_wait):
+    now, polls, latencies, pending = 0.0, 0, [], list(arrivals)
+    while now < 600:
+        polls += 1
+        received = [t for t in pending if t <= now]
+        pending = pending[len(received):]
+        latencies.extend(now - t for t in received)
+        now += next_wait(len(received))
+    latencies.sort()
+    return polls, latencies[len(latencies) // 2], latencies[-1]
+
+
+def main():
+    random.seed(0)
+    # Bursty chat: a few active minutes, then quiet
+    arrivals = sorted([random.uniform(0, 120) for _ in range(60)] + [random.uniform(300, 360) for _ in range(30)] +
+                      [random.uniform(360, 600) for _ in range(3)])
+
+    scheduler = PollScheduler()
+
+    def scheduled(count):
+        scheduler.record_poll(count, SERVER_INTERVAL)
+        return scheduler.next_interval()
+
+    for name, next_wait in (("fixed 60s", lambda count: 60), ("server 5s", lambda count: SERVER_INTERVAL),
+                            ("scheduler", scheduled)):
+        polls, median, worst = simulate(arrivals, next_wait)
+        print(f"{name:>10}: {polls:4d} polls, latency median {median:5.1f}s, max {worst:5.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+# Simulates a 4 hour stream against a fake client and a fake clock, polling as fast as the quota budget allows,
+# then restarts on the same day to check the budget picks up where it left off.
+# Run from the repo root: python -m benchmarks.quota_budget
+import os
+import tempfile
+from types import SimpleNamespace
+from lib.yt_api import QuotaBudget, QuotaExceededError, YouTubeClient
+from benchmarks.fake_youtube import FakeYouTube
+
+
+def main():
+    now = [0.0]
+    with tempfile.TemporaryDirectory() as directory:
+        state_file = os.path.join(directory, "quota.json")
+        budget = QuotaBudget(daily_limit=10000, state_file=state_file, reserve=500, stream_duration=4 * 3600,
+                             clock=lambda: now[0])
+        client = YouTubeClient(SimpleNamespace(channel_id="fake", youtube_broadcast_cache_ttl=300), youtube=FakeYouTube(),
+                               quota=budget)
+
+        polls = 0
+        start_interval = budget.min_poll_interval()
+        while now[0] < 4 * 3600:
+            try:
+                client.get_live_chat_messages("fake-chat")
+            except QuotaExceededError as e:
+                print(f"Ran out after {now[0] / 3600:.2f}h: {e}")
+                break
+            polls += 1
+            now[0] += max(budget.min_poll_interval(), 5.0)
+        print(f"{polls} polls over {now[0] / 3600:.2f}h, interval {start_interval:.1f}s, {budget.remaining} units left")
+
+        # A restart on the same day picks up where the last run left off
+        restarted = QuotaBudget(daily_limit=10000, state_file=state_file, clock=lambda: now[0])
+        print(f"After restart: {restarted.used} units used")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+# Relevance throughput for bursts of chat, one is_relevant call per message vs a single classify_batch.
+# Run from the repo root: python -m benchmarks.relevance_batch
+import time
+from lib.context_parsing import ContextParser
+from benchmarks.context_samples import SAMPLES, context_parser_config
+
+
+def main():
+    context_parser = ContextParser(context_parser_config())
+    for burst_size in (10, 100, 1000):
+        burst = (SAMPLES * (burst_size // len(SAMPLES) + 1))[:burst_size]
+
+        context_parser.clear_history()
+        start = time.perf_counter()
+        for sample in burst:
+            context_parser.is_relevant(sample)
+        single = burst_size / (time.perf_counter() - start)
+
+        context_parser.clear_history()
+        start = time.perf_counter()
+        context_parser.classify_batch(burst)
+        batched = burst_size / (time.perf_counter() - start)
+        print(f"burst of {burst_size:>4}: is_relevant {single:8.0f} msg/s | classify_batch {batched:8.0f} msg/s")
+
+
+if __name__ == '__main__':
+    main()
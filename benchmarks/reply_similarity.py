@@ -0,0 +1,33 @@
+# Reply similarity across history windows, one is_similar call per history message vs one batched rapidfuzz call.
+# Run from the repo root: python -m benchmarks.reply_similarity
+import random
+import time
+from lib.context_parsing import ContextParser, PrefilteredMessage
+from benchmarks.context_samples import context_parser_config
+
+WORDS = "hopii starship booster raptor launch tower catch orbit mars moon flight test engine static fire".split()
+
+
+def main():
+    for window in (10, 100, 1000):
+        config = context_parser_config(context_parser_history_size=window)
+        context_parser = ContextParser(config)
+        for _ in range(window):
+            text = " ".join(random.choices(WORDS, k=8))
+            context_parser.add_to_history(PrefilteredMessage(config, {"author": "viewer", "timestamp": "2023-09-18T14:33:30Z", "message": text}))
+        queries = [" ".join(random.choices(WORDS, k=8)) for _ in range(200)]
+
+        start = time.perf_counter()
+        for query in queries:
+            any(context_parser.is_similar(query, message.text, threshold=0.95) for message in context_parser.message_history)
+        pairwise = (time.perf_counter() - start) / len(queries) * 1000
+
+        start = time.perf_counter()
+        for query in queries:
+            context_parser.find_similar_in_history(query, threshold=0.95)
+        batched = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"window {window:>4}: pairwise {pairwise:.3f} ms/message | batched {batched:.3f} ms/message")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Scrape cycle latency, per-element WebDriver calls vs EXTRACT_MESSAGES_JS, on a generated local chat page.
+# Needs Chrome. Run from the repo root: python -m benchmarks.scraper_extract
+import json
+import os
+import tempfile
+import time
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from chat_fetchers.yt_chat_scraper import EXTRACT_MESSAGES_JS
+
+RENDERER_COUNTS, NEW_PER_CYCLE, CYCLES = (50, 200), 10, 20
+
+
+def write_fixture(path, count):
+    renderers = "\n".join(
+        f'<yt-live-chat-text-message-renderer id="msg{i}"><span id="timestamp">1:{i % 60:02d} PM</span>'
+        f'<span id="author-name">viewer{i % 50}</span><span id="message">chat message number {i}</span>'
+        f'</yt-live-chat-text-message-renderer>' for i in range(count))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<html><body><div id='item-scroller'>{renderers}</div></body></html>")
+
+
+def per_element(driver, seen):
+    # The previous scrape: one WebDriver call per renderer and per field
+    containers = driver.find_elements(By.CSS_SELECTOR, "yt-live-chat-text-message-renderer")
+    containers.reverse()
+    for container in containers:
+        message_id = container.get_attribute("id")
+        if message_id in seen:
+            break
+        seen.add(message_id)
+        for selector in ("span#author-name", "span#timestamp", "span#message"):
+            driver.execute_script("return arguments[0].innerText;", container.find_element(By.CSS_SELECTOR, selector))
+
+
+def main():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for count in RENDERER_COUNTS:
+                path = os.path.join(directory, f"chat_{count}.html")
+                write_fixture(path, count)
+                driver.get("file://" + path)
+                # Every cycle sees the last NEW_PER_CYCLE renderers as unseen
+                last_seen_id = f"msg{count - NEW_PER_CYCLE - 1}"
+                seen_before = {f"msg{i}" for i in range(count - NEW_PER_CYCLE)}
+
+                start = time.perf_counter()
+                for _ in range(CYCLES):
+                    per_element(driver, set(seen_before))
+                old = (time.perf_counter() - start) / CYCLES
+
+                start = time.perf_counter()
+                for _ in range(CYCLES):
+                    json.loads(driver.execute_script(EXTRACT_MESSAGES_JS, last_seen_id))
+                new = (time.perf_counter() - start) / CYCLES
+                print(f"{count:>4} renderers, {NEW_PER_CYCLE} new: per-element {old * 1000:8.1f} ms/cycle | "
+                      f"single script {new * 1000:6.1f} ms/cycle")
+    finally:
+        driver.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# Time to first chat message and browser memory, full vs lean Chrome profile (the lean one cold, then warm).
+# Needs Chrome and a live stream. Run from the repo root: python -m benchmarks.scraper_profile <live_id>
+import argparse
+import shutil
+import time
+from types import SimpleNamespace
+from chat_fetchers.yt_chat_scraper import YoutubeChatScraper
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scraper startup time and memory per Chrome profile")
+    arg_parser.add_argument("live_id")
+    args = arg_parser.parse_args()
+
+    config = SimpleNamespace(bot_display_name=None, chat_fetcher_queue_size=1000, chat_fetcher_seen_ids_size=1000,
+                             chat_fetcher_ytscraper_mode='push', chat_fetcher_ytscraper_drain_interval=1.0,
+                             chat_fetcher_ytscraper_profile='full', chat_fetcher_ytscraper_user_data_dir='chrome_profile_bench',
+                             chat_fetcher_ytscraper_humanize=False, chat_fetcher_ytscraper_humanize_interval=10)
+    shutil.rmtree(config.chat_fetcher_ytscraper_user_data_dir, ignore_errors=True)
+    for profile, label in (("full", "full"), ("lean", "lean cold"), ("lean", "lean warm")):
+        config.chat_fetcher_ytscraper_profile = profile
+        scraper = YoutubeChatScraper(config, args.live_id)
+        scraper.start()
+        time.sleep(5)  # Let the page settle before measuring memory
+        memory = scraper.browser_memory()
+        print(f"{label:>9}: chat loaded in {scraper.startup_time:.1f}s, "
+              f"browser {memory / 2 ** 20 if memory is not None else float('nan'):.0f} MiB")
+        scraper.driver.quit()
+    shutil.rmtree(config.chat_fetcher_ytscraper_user_data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# CPU use and message latency on a generated local page that appends a message every 100 ms: the scraper's poll
+# loop vs draining the MutationObserver buffer. Chrome's CPU is only reported if psutil is installed.
+# Needs Chrome. Run from the repo root: python -m benchmarks.scraper_push [--seconds 10]
+import argparse
+import json
+import os
+import tempfile
+import time
+from selenium import webdriver
+from chat_fetchers.yt_chat_scraper import DRAIN_BUFFER_JS, EXTRACT_MESSAGES_JS, INSTALL_OBSERVER_JS
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PAGE = """<html><body><div id='item-scroller'></div><script>
+let count = 0;
+setInterval(() => {
+    const renderer = document.createElement('yt-live-chat-text-message-renderer');
+    renderer.id = 'msg' + (++count);
+    renderer.innerHTML = '<span id="timestamp">1:00 PM</span><span id="author-name">viewer</span>' +
+        '<span id="message">' + Date.now() + '</span>';
+    document.getElementById('item-scroller').appendChild(renderer);
+}, 100);
+</script></body></html>"""
+
+
+def chrome_cpu(driver):
+    if psutil is None:
+        return 0.0
+    processes = psutil.Process(driver.service.process.pid).children(recursive=True)
+    return sum(sum(process.cpu_times()[:2]) for process in processes)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scraper poll vs push mode CPU and latency")
+    arg_parser.add_argument("--seconds", type=float, default=10)
+    args = arg_parser.parse_args()
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "appending_chat.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(PAGE)
+
+            for mode, drain_interval in (("poll", 0), ("push", 1.0), ("push", 0.25)):
+                driver.get("file://" + path)
+                time.sleep(0.5)
+                if mode == "push":
+                    driver.execute_script(INSTALL_OBSERVER_JS)
+                latencies = []
+                last_seen_id = None
+                round_trips = 0
+                cpu_start, chrome_start, start = time.process_time(), chrome_cpu(driver), time.perf_counter()
+                while time.perf_counter() - start < args.seconds:
+                    if mode == "poll":
+                        items = json.loads(driver.execute_script(EXTRACT_MESSAGES_JS, last_seen_id) or "[]")
+                    else:
+                        items = json.loads(driver.execute_script(DRAIN_BUFFER_JS))
+                    round_trips += 1
+                    now = time.time() * 1000
+                    for item in items:
+                        last_seen_id = item['id']
+                        latencies.append(now - int(item['message']))
+                    if drain_interval:
+                        time.sleep(drain_interval)
+                elapsed = time.perf_counter() - start
+                python_cpu = (time.process_time() - cpu_start) / elapsed
+                browser_cpu = (chrome_cpu(driver) - chrome_start) / elapsed
+                latencies.sort()
+                print(f"{mode} {drain_interval:4.2f}s: {round_trips:5d} round trips, {len(latencies)} messages, "
+                      f"latency median {latencies[len(latencies) // 2]:5.0f} ms max {latencies[-1]:5.0f} ms, "
+                      f"CPU python {python_cpu * 100:5.1f}% chrome {browser_cpu * 100:5.1f}%")
+    finally:
+        driver.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Per message cost of the scraper's launch time check: the previous convert_timestamp + dateutil round trip +
+# rounding both sides, vs the cached parse against the precomputed cutoff.
+# Run from the repo root: python -m benchmarks.scraper_timestamps
+import time
+from datetime import datetime, timedelta, timezone
+from dateutil import parser
+from dateutil.tz import tzlocal
+from chat_fetchers.yt_chat_scraper import display_time_to_epoch, epoch_to_iso
+
+
+def old_convert_timestamp(ts):
+    current_time = datetime.now(timezone.utc)
+    hour, minute_ampm = ts.split()
+    hour, minute = map(int, hour.split(":"))
+    if "PM" in minute_ampm and hour != 12:
+        hour += 12
+    if "AM" in minute_ampm and hour == 12:
+        hour = 0
+    if hour > current_time.hour:
+        current_time -= timedelta(days=1)
+    return current_time.replace(hour=hour, minute=minute, second=0, microsecond=0).isoformat()
+
+
+def round_to_nearest_minute(dt):
+    return datetime.fromtimestamp(round(dt.timestamp() / 60) * 60)
+
+
+def main():
+    # A busy chat: many messages share the current minute's display string
+    now = datetime.now()
+    displayed = [(now - timedelta(minutes=i % 3)).strftime("%I:%M %p").lstrip("0") for i in range(20000)]
+    launch_time = now - timedelta(hours=1)
+    launch_cutoff = launch_time.timestamp() // 60 * 60
+
+    start = time.perf_counter()
+    for ts in displayed:
+        timestamp = old_convert_timestamp(ts)
+        message_timestamp = parser.parse(timestamp, default=datetime(datetime.now().year, 1, 1, tzinfo=tzlocal())).replace(tzinfo=None)
+        round_to_nearest_minute(message_timestamp) >= round_to_nearest_minute(launch_time)
+    old = (time.perf_counter() - start) / len(displayed)
+
+    start = time.perf_counter()
+    for ts in displayed:
+        message_time = display_time_to_epoch(ts)
+        epoch_to_iso(message_time)
+        message_time >= launch_cutoff
+    new = (time.perf_counter() - start) / len(displayed)
+    print(f"old {old * 1e6:.2f} us/message | new {new * 1e6:.2f} us/message ({old / new:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import queue
+import threading
+
+
+class ChatSource:
+    """Something that feeds chat messages into the ChatMerger: a chat fetcher, a replay, manual input, STT...
+
+    Subclasses set source_name (the tag the merged messages carry), implement start_threaded/stop and hand
+    their messages to put_message. Messages are dicts with 'author', 'timestamp' (ISO 8601) and 'message',
+    plus an optional unique 'id', and have to be put in timestamp order.
+
+    The queue is bounded, a source that gets ahead of the merger blocks in put_message until there's room.
+    """
+    source_name = None
+
+    def __init__(self, config):
+        self.config = config
+        self.message_queue = queue.Queue(maxsize=self.config.chat_fetcher_queue_size)
+        self.message_event = threading.Event()  # Replaced by ChatMerger's shared event
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, bot):
+        """Build the source from the config and the running LiveStreamChatBot."""
+        return cls(config)
+
+    def put_message(self, message):
+        """Queue a message for the merger, blocking while the queue is full. Returns False if stopped first."""
+        while not self.stop_event.is_set():
+            try:
+                self.message_queue.put(message, timeout=0.5)
+            except queue.Full:
+                continue
+            self.message_event.set()
+            return True
+        return False
+
+    def log_stats(self):
+        """Log whatever the source measures, called periodically next to the pipeline stats."""
+        pass
+
+    def start_threaded(self):
+        raise NotImplementedError("ChatSource.start_threaded() must be implemented by subclass.")
+
+    def stop(self):
+        raise NotImplementedError("ChatSource.stop() must be implemented by subclass.")
@@ -0,0 +1,33 @@
+import importlib
+from lib.logger import logger
+
+# Source name (as used in [ChatFetchers] sources) -> "module:Class". Modules are imported only when the
+# source is enabled, so the scraper's selenium dependency isn't needed to run the API fetcher and vice versa.
+CHAT_SOURCES = {
+    "ytapi": "chat_fetchers.yt_api_chat:YouTubeChat",
+    "ytscraper": "chat_fetchers.yt_chat_scraper:YoutubeChatScraper",
+    "ytinnertube": "chat_fetchers.yt_innertube_chat:YoutubeInnertubeChat",
+    "synthetic": "chat_fetchers.synthetic:SyntheticChat",
+}
+
+
+def register_source(name, path):
+    """Make a ChatSource subclass available to the config under name, path is "module:Class"."""
+    CHAT_SOURCES[name] = path
+
+
+def get_source_class(name):
+    try:
+        module_name, class_name = CHAT_SOURCES[name].split(":")
+    except KeyError:
+        raise ValueError(f"Unknown chat source '{name}', expected one of {sorted(CHAT_SOURCES)}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_sources(config, bot):
+    """Instantiate every chat source listed in the config."""
+    sources = []
+    for name in config.chat_fetcher_sources:
+        logger.info(f"Setting up chat source '{name}'")
+        sources.append(get_source_class(name).from_config(config, bot))
+    return sources
@@ -0,0 +1,51 @@
+import itertools
+import random
+import threading
+from datetime import datetime, timezone
+from lib.logger import logger
+from .base import ChatSource
+
+
+class SyntheticChat(ChatSource):
+    """Generates fake chat at a fixed rate, for benchmarking the merger and everything after it.
+
+    A rate of 0 generates as fast as the merger accepts messages.
+    """
+    source_name = "synthetic"
+    _instances = itertools.count(1)
+
+    def __init__(self, config, rate=None, authors=None, seed=None):
+        super().__init__(config)
+        self.rate = self.config.chat_fetcher_synthetic_rate if rate is None else rate
+        self.authors = self.config.chat_fetcher_synthetic_authors if authors is None else authors
+        self.random = random.Random(seed)
+        self.instance = next(self._instances)  # Keeps ids and texts unique across several synthetic sources
+        self.generated = 0
+        self.thread = None
+
+    def generate_message(self):
+        self.generated += 1
+        return {
+            'id': f"synthetic-{self.instance}-{self.generated}",
+            'author': f"viewer{self.random.randrange(self.authors)}",
+            'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            'message': f"synthetic message {self.instance}.{self.generated}"
+        }
+
+    def run(self):
+        interval = 1 / self.rate if self.rate else 0
+        while not self.stop_event.is_set():
+            if not self.put_message(self.generate_message()):
+                break
+            if interval and self.stop_event.wait(interval):
+                break
+        logger.verbose(f"Synthetic chat stopped after {self.generated} messages.")
+
+    def start_threaded(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
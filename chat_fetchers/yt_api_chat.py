@@ -1,13 +1,18 @@
-import queue
 import threading
-import time
 from googleapiclient.errors import HttpError
 from lib.logger import logger
+from lib.dedup import BoundedSet, compact_id
+from lib.poll_scheduler import PollScheduler
+from lib.yt_api import QuotaExceededError
+from lib.timestamps import timestamp_to_epoch
+from .base import ChatSource
 
-class YouTubeChat:
+class YouTubeChat(ChatSource):
+    source_name = "youtube_api"
+    MAX_RESULTS = 2000  # Most the API returns per page
 
     def __init__(self, config, youtube_client):
-        self.config = config
+        super().__init__(config)
         logger.info("Setting up YouTubeChat API")
         self.bot_display_name = self.config.bot_display_name
         self.live_chat_id = None
@@ -16,86 +21,98 @@ class YouTubeChat:
         # YouTube API client setup
         self.youtube = youtube_client
 
-        self.wait_time = 1  # Time to wait between API requests
+        self.poll_scheduler = PollScheduler(max_idle_interval=self.config.chat_fetcher_ytapi_max_idle_interval,
+                                            max_backoff_interval=self.config.chat_fetcher_ytapi_max_backoff_interval)
 
         # Similar attributes to YoutubeChatScraper
-        self.seen_messages = set()
-        self.message_queue = queue.Queue()
-        self.stop_event = threading.Event()
+        self.seen_messages = BoundedSet(self.config.chat_fetcher_seen_ids_size, max_age=self.config.chat_fetcher_seen_ids_max_age,
+                                        key=compact_id)
         self.error_count = 0
         self.MAX_ERRORS = 5
         self.running = False
 
+    @classmethod
+    def from_config(cls, config, bot):
+        if bot.youtube_api_client is None:
+            raise ValueError("The ytapi chat source needs the YouTube API enabled in config.ini.")
+        return cls(config, bot.youtube_api_client)
+
     def fetch_messages(self):
+        """Fetch one page of chat, queue the new messages and return how many there were."""
         logger.verbose("Fetching messages from YouTube API")
         if not self.live_chat_id:
             self.live_chat_id = self.youtube.get_live_chat_id()
 
-        try:
-            latest_messages = []
-            max_results = 100
-            while self.running:
-                messages_data = self.youtube.get_live_chat_messages(self.live_chat_id, max_results=max_results, page_token=self.next_page_token)
-
-                # Storing the next page token and resetting error_count
-                self.error_count = 0
-
-                # Looping through each item in the response
-                latest_messages = messages_data['items'] + latest_messages
-                polling_interval = messages_data.get('pollingIntervalMillis', 10000) / 1000 + 1
-                # Check if there's another page
-                self.next_page_token = messages_data.get('nextPageToken')
-                logger.debug(f"Next page token: {self.next_page_token}")
-                if not self.next_page_token or len(messages_data['items']) < max_results:
-                    logger.debug("No more pages")
-                    break
-
-                if not self.next_page_token:
-                    logger.debug("No next page token")
-                    break
-
-                for _ in range(polling_interval):
-                    if not self.running:
-                        return
-                    time.sleep(1)
-
-            for chat_item in latest_messages:
-                message_id = chat_item['id']
-                if message_id not in self.seen_messages:
-                    # print(f"Recieved Message: {chat_item}")
-                    author_name = chat_item['authorDetails']['displayName']
-                    if author_name == self.bot_display_name:
-                        continue
-                    timestamp = chat_item['snippet']['publishedAt']
-                    message = chat_item['snippet']['displayMessage']
-
-                    self.message_queue.put({
-                        'author': author_name,
-                        'timestamp': timestamp,
-                        'message': message
-                    })
-                    self.seen_messages.add(message_id)
-        except HttpError as e:
-            logger.error(f"An error occurred: {e}")
-            self.error_count += 1
+        messages_data = self.youtube.get_live_chat_messages(self.live_chat_id, max_results=self.MAX_RESULTS, page_token=self.next_page_token)
+        self.error_count = 0
+        self.next_page_token = messages_data.get('nextPageToken')
+        logger.debug("Next page token: %s", self.next_page_token)
+
+        new_messages = 0
+        for chat_item in messages_data['items']:
+            message_id = chat_item['id']
+            if message_id in self.seen_messages:
+                continue
+            self.seen_messages.add(message_id)
+            author_name = chat_item['authorDetails']['displayName']
+            if author_name == self.bot_display_name:
+                continue
+            timestamp = chat_item['snippet']['publishedAt']
+            message = chat_item['snippet']['displayMessage']
+
+            self.put_message({
+                'id': message_id,
+                'author': author_name,
+                'timestamp': timestamp,
+                'message': message
+            })
+            new_messages += 1
+            # The first page is the chat backlog, its age isn't our latency
+            if self.poll_scheduler.polls > 0:
+                try:
+                    self.poll_scheduler.record_latency(timestamp_to_epoch(timestamp))
+                except ValueError:
+                    pass
+
+        server_interval = messages_data.get('pollingIntervalMillis', 10000) / 1000
+        # Don't poll faster than the daily quota can keep up for the rest of the stream
+        self.poll_scheduler.min_interval = self.youtube.quota.min_poll_interval()
+        self.poll_scheduler.record_poll(new_messages, server_interval)
+        return new_messages
 
     def run_chat(self):
         self.running = True
         while not self.stop_event.is_set() and self.error_count < self.MAX_ERRORS:
             try:
                 self.fetch_messages()
-                for _ in range(60):
-                    if not self.running or self.stop_event.is_set():
-                        return
-                    time.sleep(1)
+            except QuotaExceededError as e:
+                logger.warning(f"Out of YouTube API quota: {e}")
+                self.poll_scheduler.record_error()
+            except HttpError as e:
+                if e.resp.status in (403, 429) and ('quota' in str(e).lower() or 'ratelimit' in str(e).lower()):
+                    # Quota and rate limit errors are waited out rather than counted towards MAX_ERRORS
+                    logger.warning(f"YouTube API quota or rate limit hit: {e}")
+                else:
+                    logger.error(f"An error occurred: {e}")
+                    self.error_count += 1
+                self.poll_scheduler.record_error()
             except Exception as e:
                 logger.error(f"An error occurred: {e}")
                 self.error_count += 1
+                self.poll_scheduler.record_error()
+
+            if self.stop_event.wait(self.poll_scheduler.next_interval()):
+                break
 
         if self.error_count >= self.MAX_ERRORS:
             logger.error("Max errors reached. Exiting scraper.")
             self.stop_event.set()
 
+    def log_stats(self):
+        self.poll_scheduler.log_stats("YouTubeChat")
+        self.seen_messages.log_stats("YouTubeChat")
+        self.youtube.quota.log_stats()
+
     def start_threaded(self):
         self.api_thread = threading.Thread(target=self.run_chat)
         self.api_thread.start()
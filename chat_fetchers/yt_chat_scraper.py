@@ -6,28 +6,126 @@ import random
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, NoSuchElementException, MoveTargetOutOfBoundsException
 import logging
 import threading
-import queue
+import json
+import os
+from collections import deque
 from lib.logger import logger
-from dateutil import parser
-import pytz
-from dateutil.tz import tzlocal
-
-chromedriver_autoinstaller.install()
-
-def is_element_in_viewport(driver, element, padding=10):
-    return driver.execute_script("""
-        let rect = arguments[0].getBoundingClientRect();
-        return (
-            rect.top >= {0} &&
-            rect.left >= {0} &&
-            rect.bottom <= (window.innerHeight || document.documentElement.clientHeight) - {0} &&
-            rect.right <= (window.innerWidth || document.documentElement.clientWidth) - {0}
-        );
-    """.format(padding), element)
+from lib.dedup import BoundedSet, compact_id
+from .base import ChatSource
+try:
+    import psutil
+except ImportError:
+    psutil = None  # Only needed to report the browser's memory use
+
+# Lean profile: requests for anything that isn't needed to read chat text are dropped
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",  # Avatars, emoji, badges, thumbnails
+    "*.woff", "*.woff2", "*.ttf", "*.otf",  # Fonts
+    "*.mp4", "*.webm", "*.m4a", "*googlevideo.com/*",  # Media
+    "*yt3.ggpht.com/*", "*i.ytimg.com/*",
+]
+
+# Returns every chat message after the renderer with id arguments[0] (all of them if it's not in the page) as a
+# JSON array in chronological order, or null if there are no messages on the page at all.
+EXTRACT_MESSAGES_JS = """
+const lastId = arguments[0];
+const renderers = document.querySelectorAll('yt-live-chat-text-message-renderer');
+if (renderers.length === 0) {
+    return null;
+}
+let start = 0;
+if (lastId) {
+    for (let i = renderers.length - 1; i >= 0; i--) {
+        if (renderers[i].id === lastId) {
+            start = i + 1;
+            break;
+        }
+    }
+}
+const text = (renderer, selector) => {
+    const element = renderer.querySelector(selector);
+    return element ? element.innerText.trim() : '';
+};
+// The renderer's data holds the exact publish time, the displayed timestamp is only to the minute
+const usec = (renderer) => {
+    const data = renderer.data || (renderer.__data && renderer.__data.data);
+    return data && data.timestampUsec ? data.timestampUsec : null;
+};
+const messages = [];
+for (let i = start; i < renderers.length; i++) {
+    messages.push({
+        id: renderers[i].id,
+        author: text(renderers[i], 'span#author-name'),
+        timestamp: text(renderers[i], 'span#timestamp'),
+        message: text(renderers[i], 'span#message'),
+        usec: usec(renderers[i])
+    });
+}
+return JSON.stringify(messages);
+"""
+
+# Push mode: buffers every chat renderer added to the page from now on, with the time it appeared. Text is only
+# read when the buffer is drained, by then YouTube has filled the renderer in.
+INSTALL_OBSERVER_JS = """
+if (window.__chatObserver) {
+    return true;
+}
+window.__chatBuffer = [];
+window.__chatObserver = new MutationObserver((mutations) => {
+    const now = Date.now();
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (node.nodeName === 'YT-LIVE-CHAT-TEXT-MESSAGE-RENDERER') {
+                window.__chatBuffer.push({node: node, observed: now});
+            }
+        }
+    }
+});
+window.__chatObserver.observe(document.body, {childList: true, subtree: true});
+return true;
+"""
+
+# Empties the buffer and returns its messages as a JSON array in the order they appeared, or null if the
+# observer is gone (e.g. the page reloaded).
+DRAIN_BUFFER_JS = """
+if (!window.__chatObserver) {
+    return null;
+}
+const buffered = window.__chatBuffer;
+window.__chatBuffer = [];
+const text = (renderer, selector) => {
+    const element = renderer.querySelector(selector);
+    return element ? element.innerText.trim() : '';
+};
+const usec = (renderer) => {
+    const data = renderer.data || (renderer.__data && renderer.__data.data);
+    return data && data.timestampUsec ? data.timestampUsec : null;
+};
+return JSON.stringify(buffered.map((entry) => ({
+    id: entry.node.id,
+    author: text(entry.node, 'span#author-name'),
+    timestamp: text(entry.node, 'span#timestamp'),
+    message: text(entry.node, 'span#message'),
+    usec: usec(entry.node),
+    observed: entry.observed
+})));
+"""
+
+# Returns the chat renderers fully inside the viewport (minus arguments[0] pixels of padding)
+VISIBLE_MESSAGES_JS = """
+const padding = arguments[0];
+const height = window.innerHeight || document.documentElement.clientHeight;
+const width = window.innerWidth || document.documentElement.clientWidth;
+return Array.from(document.querySelectorAll('yt-live-chat-text-message-renderer')).filter((renderer) => {
+    const rect = renderer.getBoundingClientRect();
+    return rect.top >= padding && rect.left >= padding && rect.bottom <= height - padding && rect.right <= width - padding;
+});
+"""
 
 
 def move_mouse_smoothly(actions, target_element, steps=10):
@@ -44,25 +142,43 @@ def move_mouse_smoothly(actions, target_element, steps=10):
     actions.move_to_element(target_element)
 
 
-def random_interactions(driver, delay=2.0):
-    try:
-        actions = ActionChains(driver)
+def random_interactions(driver, delay=2.0, driver_lock=None, timings=None):
+    """Scroll a little, pause, then move the mouse onto a random visible chat message.
+
+    The driver is only held (driver_lock) while it's being used, not during the pause. timings, if given, is a
+    dict that collects [count, total seconds] per activity.
+    """
+    driver_lock = driver_lock or threading.Lock()
 
+    def record(activity, start):
+        if timings is not None:
+            entry = timings.setdefault(activity, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+    try:
         # 1. Randomly scroll
+        start = time.perf_counter()
         scroll_amount = random.randint(-100, 100)  # Random value for scroll
-        driver.execute_script(f"window.scrollBy(0,{scroll_amount});")
+        with driver_lock:
+            driver.execute_script(f"window.scrollBy(0,{scroll_amount});")
+        record("scroll", start)
 
         # 2. Random pause
+        start = time.perf_counter()
         time.sleep(delay)
+        record("pause", start)
 
         # 3. Move mouse cursor to random elements
-        chat_containers = driver.find_elements(By.CSS_SELECTOR, "yt-live-chat-text-message-renderer")
-        visible_containers = [container for container in chat_containers if is_element_in_viewport(driver, container)]
-
-        if visible_containers:
-            random_message = random.choice(visible_containers)
-            move_mouse_smoothly(actions, random_message)
-            actions.perform()
+        start = time.perf_counter()
+        with driver_lock:
+            visible_containers = driver.execute_script(VISIBLE_MESSAGES_JS, 10)
+            if visible_containers:
+                actions = ActionChains(driver)
+                random_message = random.choice(visible_containers)
+                move_mouse_smoothly(actions, random_message)
+                actions.perform()
+        record("mouse", start)
     except MoveTargetOutOfBoundsException:
         logging.warning("MoveTargetOutOfBoundsException while performing random interactions.")
     except Exception as err:
@@ -72,54 +188,86 @@ def scroll_to_bottom(driver):
     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
 
-def convert_timestamp(ts):
-    current_time = datetime.now(timezone.utc)
-    hour, minute_ampm = ts.split()
-    hour, minute = map(int, hour.split(":"))
+# How far ahead of our clock a displayed time can be and still be today, for clock skew against the sender
+DISPLAY_TIME_FUTURE_TOLERANCE = timedelta(minutes=5)
+
 
-    if "PM" in minute_ampm and hour != 12:
+@lru_cache(maxsize=256)
+def _display_time_to_epoch(ts, now_minute):
+    # Cached per display string and minute of the clock, every message of a busy minute shares one parse
+    # split() also takes the narrow no-break space newer Chrome versions put before AM/PM
+    time_part, *period = ts.split()
+    hour, minute = map(int, time_part.split(":"))
+    period = period[0].upper() if period else ""
+    if period == "PM" and hour != 12:
         hour += 12
-    if "AM" in minute_ampm and hour == 12:
+    elif period == "AM" and hour == 12:
         hour = 0
 
-    # Adjust the day if needed
-    if hour > current_time.hour:
-        current_time -= timedelta(days=1)
+    # YouTube shows the viewer's local wall clock time. A time well past now is from yesterday, one just past
+    # it is clock skew (or the minute display_time_to_epoch rounded now down from).
+    now = datetime.fromtimestamp(now_minute * 60)
+    displayed = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if displayed > now + DISPLAY_TIME_FUTURE_TOLERANCE:
+        displayed -= timedelta(days=1)
+    return displayed.timestamp()
 
-    converted_time = current_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    return converted_time.isoformat()
 
+def display_time_to_epoch(ts, now=None):
+    """Epoch seconds for a chat timestamp as displayed ("1:05 PM" or 24 hour "13:05"), to the minute."""
+    return _display_time_to_epoch(ts, int((time.time() if now is None else now) // 60))
 
-def round_to_nearest_minute(dt):
-    # Convert datetime to timestamp
-    timestamp = dt.timestamp()
 
-    # Round to the nearest minute
-    rounded_timestamp = round(timestamp / 60) * 60
+def epoch_to_iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace('+00:00', 'Z')
 
-    # Convert back to datetime
-    return datetime.fromtimestamp(rounded_timestamp)
 
-class YoutubeChatScraper:
+def convert_timestamp(ts, now=None):
+    """ISO 8601 UTC timestamp for a chat timestamp as displayed, see display_time_to_epoch."""
+    return epoch_to_iso(display_time_to_epoch(ts, now))
+
+class YoutubeChatScraper(ChatSource):
+    source_name = "youtube_scraper"
 
     def __init__(self, config, live_id, driver_options=None):
-        self.config = config
+        super().__init__(config)
         self.bot_display_name = self.config.bot_display_name
         self.url = f"https://www.youtube.com/live_chat?is_popout=1&v={live_id}"
-        self.seen_messages = set()
-        self.message_queue = queue.Queue()
-        self.stop_event = threading.Event()
+        # Size bound only: in a quiet chat a message can sit in the page for hours and must not come back
+        self.seen_messages = BoundedSet(self.config.chat_fetcher_seen_ids_size, key=compact_id)
         self.running = False
 
         self.error_count = 0
         self.MAX_ERRORS = 5
         self.restart_attempt = False
 
-        self.launch_time = datetime.now()
+        self.launch_time = time.time()
+        # Displayed times are truncated to the minute, so anything shown in the launch minute counts as new
+        self.launch_cutoff = self.launch_time // 60 * 60
 
         self.last_timestamp = None
+        self.last_seen_id = None
+        self.cycle_times = deque(maxlen=500)  # Seconds per extraction round trip, most recent cycles only
+        self.push_latencies = deque(maxlen=500)  # Push mode, seconds from a message appearing to being drained
+
+        self.mode = self.config.chat_fetcher_ytscraper_mode
+        self.profile = self.config.chat_fetcher_ytscraper_profile
+        self.startup_time = None
+
+        # WebDriver isn't thread safe, the scrape loop and the humanizer take turns
+        self.driver_lock = threading.Lock()
+        self.humanize = self.config.chat_fetcher_ytscraper_humanize
+        self.humanize_interval = self.config.chat_fetcher_ytscraper_humanize_interval
+        self.humanizer_timings = {}
+        self.humanizer_thread = None
+        self.drain_interval = self.config.chat_fetcher_ytscraper_drain_interval
+
+    @classmethod
+    def from_config(cls, config, bot):
+        return cls(config, bot.live_id)
 
     def _initialize_driver(self, driver_options=None):
+        lean = driver_options is None and self.profile == 'lean'
         if driver_options is None:
             driver_options = webdriver.ChromeOptions()
             # Adding argument to disable the AutomationControlled flag
@@ -130,12 +278,37 @@ class YoutubeChatScraper:
             driver_options.add_argument("--window-size=383,600")
             # Turn-off userAutomationExtension
             driver_options.add_experimental_option("useAutomationExtension", False)
-
+            if lean:
+                driver_options.add_argument("--headless=new")
+                driver_options.add_argument("--disable-gpu")
+                driver_options.add_argument("--disable-extensions")
+                driver_options.add_argument("--mute-audio")
+                driver_options.add_argument("--blink-settings=imagesEnabled=false")
+                # Reusing the profile keeps the HTTP cache and cookies, so warm starts load less
+                user_data_dir = os.path.abspath(self.config.chat_fetcher_ytscraper_user_data_dir)
+                driver_options.add_argument(f"--user-data-dir={user_data_dir}")
+
+        # Fetches a chromedriver matching the installed Chrome, only once a browser is actually needed
+        chromedriver_autoinstaller.install()
         driver = webdriver.Chrome(options=driver_options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        if lean:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
 
         return driver
 
+    def browser_memory(self):
+        """Resident memory of chromedriver and every browser process it started, in bytes. None without psutil."""
+        if psutil is None or not getattr(self, 'driver', None):
+            return None
+        try:
+            driver_process = psutil.Process(self.driver.service.process.pid)
+            processes = [driver_process] + driver_process.children(recursive=True)
+            return sum(process.memory_info().rss for process in processes)
+        except psutil.Error:
+            return None
+
 
     def check_page_changed(self):
         # Depending on what happens when access is blocked,
@@ -167,7 +340,8 @@ class YoutubeChatScraper:
 
 
     def start(self, driver_options=None):
-        logger.info(f"Opening {self.url} in chrome")
+        logger.info(f"Opening {self.url} in chrome ({self.profile} profile)")
+        start_time = time.perf_counter()
 
         self.driver = self._initialize_driver(driver_options)
         logger.info(f"Starting to scrape chat messages from {self.url}")
@@ -209,77 +383,110 @@ class YoutubeChatScraper:
         WebDriverWait(self.driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "yt-live-chat-text-message-renderer"))
         )
+        self.startup_time = time.perf_counter() - start_time
+        memory = self.browser_memory()
+        logger.info(f"Chat loaded in {self.startup_time:.1f}s"
+                    + (f", browser using {memory / 2 ** 20:.0f} MiB" if memory is not None else ""))
+
+    def _process_messages(self, items):
+        for item in items:
+            self.last_seen_id = item['id']
+            if item['id'] in self.seen_messages:
+                continue
+            self.seen_messages.add(item['id'])
+            author_name = item['author']
+            message = item['message']
+            if item.get('usec'):
+                # Exact publish time from the renderer's data
+                message_time = int(item['usec']) / 1e6
+                cutoff = self.launch_time
+            else:
+                message_time = display_time_to_epoch(item['timestamp'])
+                cutoff = self.launch_cutoff
+            timestamp = epoch_to_iso(message_time)
+
+            logger.debug("Processing message from %s at %s...", author_name, timestamp)
+            if message_time < cutoff:
+                # This is an old message, skip it
+                logger.debug("Message from %s at %s is before launch time %s. Skipping...",
+                             author_name, timestamp, epoch_to_iso(self.launch_time))
+                continue
 
-    def get_chat_data(self):
-        self.running = True
-        logger.debug("Getting chat data...")
-        # Find all chat container elements
-        chat_containers = self.driver.find_elements(By.CSS_SELECTOR, "yt-live-chat-text-message-renderer")
-        if not chat_containers:
+            if author_name == self.bot_display_name:
+                continue
+
+            self.put_message({
+                'author': author_name,
+                'timestamp': timestamp,
+                'message': message
+            })
+
+    def _extract_messages(self):
+        # One round trip for every message after the last one we saw
+        start = time.perf_counter()
+        with self.driver_lock:
+            extracted = self.driver.execute_script(EXTRACT_MESSAGES_JS, self.last_seen_id)
+        self.cycle_times.append(time.perf_counter() - start)
+        if extracted is None:
             raise Exception("No chat containers found. The page might not have loaded properly or there's an issue with the live chat.")
+        return json.loads(extracted)
+
+    def drain_chat_data(self):
+        """Push mode: process whatever the page's MutationObserver buffered since the last drain."""
+        self.running = True
+        start = time.perf_counter()
+        with self.driver_lock:
+            drained = self.driver.execute_script(DRAIN_BUFFER_JS)
+        self.cycle_times.append(time.perf_counter() - start)
+        if drained is None:
+            # The page lost the observer, catch up on anything missed the slow way and install it again
+            logger.warning("Chat observer missing, reinstalling it.")
+            with self.driver_lock:
+                self.driver.execute_script(INSTALL_OBSERVER_JS)
+            self._process_messages(self._extract_messages())
             return
 
-        new_messages = []
-        chat_containers.reverse()
-
-        for container in chat_containers:
-            try:
-                message_id = container.get_attribute("id")
-                if message_id not in self.seen_messages:
-                    self.seen_messages.add(message_id)
-                    author_name = self.driver.execute_script("return arguments[0].innerText;",
-                                                        container.find_element(By.CSS_SELECTOR,
-                                                                               "span#author-name")).strip()
-                    timestamp = convert_timestamp(self.driver.execute_script("return arguments[0].innerText;",
-                                                                        container.find_element(By.CSS_SELECTOR,
-                                                                                               "span#timestamp")).strip())
-                    message = self.driver.execute_script("return arguments[0].innerText;",
-                                                         container.find_element(By.CSS_SELECTOR,
-                                                                                "span#message")).strip()
-
-                    logger.debug(f"Processing message from {author_name} at {timestamp}...")
-                    message_timestamp = parser.parse(timestamp, default=datetime(datetime.now().year, 1, 1, tzinfo=tzlocal())).replace(tzinfo=None)
-
-                    if round_to_nearest_minute(message_timestamp) >= round_to_nearest_minute(self.launch_time):
-                        # This is a new message after bot launch, process it
-                        logger.debug(
-                            f"Message from {author_name} at {message_timestamp} is after launch time {self.launch_time}. Adding to queue...")
-                    else:
-                        # This is an old message, skip it
-                        logger.debug(
-                            f"Message from {author_name} at {message_timestamp} is before launch time {self.launch_time}. Skipping...")
-                        continue
-
-                    # print(f"SCRAPED: {message}")
-                    if author_name == self.bot_display_name:
-                        continue
-
-                    self.message_queue.put({
-                        'author': author_name,
-                        'timestamp': timestamp,
-                        'message': message
-                    })
-                else:
-                    break
-            except StaleElementReferenceException:
-                logger.warning("Stale element encountered...")
-                continue
+        now = time.time() * 1000
+        items = json.loads(drained)
+        for item in items:
+            self.push_latencies.append((now - item['observed']) / 1000)
+        self._process_messages(items)
 
+    def get_chat_data(self):
+        self.running = True
+        logger.debug("Getting chat data...")
+        self._process_messages(self._extract_messages())
 
-        # # Print the extracted data
-        # for item in new_messages:
-        #     print(f"Author: {item['author']}, Timestamp: {item['timestamp']}, Message: {item['message']}")
+        with self.driver_lock:
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-        # Emulate random interactions
-        if random.random() < 0.33:
-            random_sleep = random.uniform(0.1, 2.0)
-            random_interactions(self.driver, random_sleep)
+            scrollable_element = self.driver.find_element(By.ID, 'item-scroller')
+            self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable_element)
 
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    def run_humanizer(self):
+        """Emulate random interactions every humanize_interval seconds on average, apart from the scraping."""
+        while not self.stop_event.wait(random.uniform(0.5, 1.5) * self.humanize_interval):
+            random_interactions(self.driver, random.uniform(0.1, 2.0), self.driver_lock, self.humanizer_timings)
 
-        scrollable_element = self.driver.find_element(By.ID, 'item-scroller')
-        self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable_element)
 
+    def log_stats(self):
+        self.seen_messages.log_stats("YoutubeChatScraper")
+        if not self.cycle_times:
+            return
+        cycle_times = sorted(self.cycle_times)
+        logger.info(f"YoutubeChatScraper {self.mode} extraction - median {cycle_times[len(cycle_times) // 2] * 1000:.1f} ms, "
+                    f"max {cycle_times[-1] * 1000:.1f} ms over the last {len(cycle_times)} cycles")
+        if self.humanizer_timings:
+            activities = ", ".join(f"{activity} {count}x avg {total / count * 1000:.0f} ms"
+                                   for activity, (count, total) in self.humanizer_timings.items())
+            logger.info(f"YoutubeChatScraper humanizer - {activities}")
+        memory = self.browser_memory()
+        if memory is not None:
+            logger.info(f"YoutubeChatScraper browser memory - {memory / 2 ** 20:.0f} MiB")
+        if self.push_latencies:
+            latencies = sorted(self.push_latencies)
+            logger.info(f"YoutubeChatScraper push latency - median {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+                        f"max {latencies[-1] * 1000:.0f} ms")
 
     def run_scraper(self):
         try:
@@ -288,9 +495,21 @@ class YoutubeChatScraper:
             logging.error(f"Error while starting: {e}")
             self.stop_event.set()
             return
+        if self.mode == 'push':
+            self.driver.execute_script(INSTALL_OBSERVER_JS)
+        if self.humanize:
+            self.humanizer_thread = threading.Thread(target=self.run_humanizer, daemon=True)
+            self.humanizer_thread.start()
         while not self.stop_event.is_set() and self.error_count < self.MAX_ERRORS:
             try:
-                self.get_chat_data()
+                if self.mode == 'push':
+                    if self.last_seen_id is None:
+                        # The observer only sees what's added after it, pick up what's already on the page once
+                        self._process_messages(self._extract_messages())
+                    self.drain_chat_data()
+                    self.stop_event.wait(self.drain_interval)
+                else:
+                    self.get_chat_data()
             except Exception as e:
                 if "urllib3.exceptions.NewConnectionError" in str(e) or "urllib3.exceptions.MaxRetryError" in str(e):
                     break
@@ -358,7 +577,7 @@ class YoutubeChatScraper:
         self.stop_event.set()
         self.running = False
         self.driver.quit()
-        self.driver = self._initialize_driver()
+        # start() opens the new driver, a second one here would hold on to the lean profile's user-data-dir
         self.start_threaded()
 
 
@@ -0,0 +1,194 @@
+import json
+import re
+import threading
+from datetime import datetime, timezone
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lib.logger import logger
+from lib.dedup import BoundedSet, compact_id
+from lib.poll_scheduler import PollScheduler
+from .base import ChatSource
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/116.0.0.0 Safari/537.36")
+
+
+def _embedded_json(html, marker):
+    """Decode the JSON object that follows marker in html, None if the marker isn't there."""
+    position = html.find(marker)
+    if position == -1:
+        return None
+    start = html.index("{", position + len(marker))
+    return json.JSONDecoder().raw_decode(html, start)[0]
+
+
+def parse_live_chat_page(html):
+    """Pull what polling needs out of the live_chat page: the API key, client context and initial chat data."""
+    api_key = re.search(r'"INNERTUBE_API_KEY"\s*:\s*"([^"]+)"', html)
+    context = _embedded_json(html, '"INNERTUBE_CONTEXT":')
+    initial_data = _embedded_json(html, 'window["ytInitialData"] =') or _embedded_json(html, 'var ytInitialData =')
+    if not api_key or context is None or initial_data is None:
+        raise ValueError("Live chat page is missing the INNERTUBE key, context or ytInitialData (not live?)")
+    return api_key.group(1), context, initial_data['contents']['liveChatRenderer']
+
+
+def parse_continuation(chat_data):
+    """Return (continuation token, server timeout in seconds) from liveChatRenderer/liveChatContinuation data."""
+    for continuation in chat_data.get('continuations', []):
+        for kind in ('invalidationContinuationData', 'timedContinuationData', 'reloadContinuationData'):
+            if kind in continuation:
+                data = continuation[kind]
+                return data['continuation'], data.get('timeoutMs', 5000) / 1000
+    return None, None
+
+
+def _message_text(runs):
+    parts = []
+    for run in runs:
+        if 'text' in run:
+            parts.append(run['text'])
+        elif 'emoji' in run:
+            emoji = run['emoji']
+            # Unicode emoji carry the character as their id, channel emoji only have a :shortcut:
+            if emoji.get('isCustomEmoji') and emoji.get('shortcuts'):
+                parts.append(emoji['shortcuts'][0])
+            else:
+                parts.append(emoji.get('emojiId', ''))
+    return "".join(parts)
+
+
+def parse_chat_actions(actions):
+    """Turn addChatItemAction text messages into the fetchers' message dicts, other actions are skipped."""
+    messages = []
+    for action in actions:
+        renderer = action.get('addChatItemAction', {}).get('item', {}).get('liveChatTextMessageRenderer')
+        if not renderer:
+            continue
+        published = datetime.fromtimestamp(int(renderer['timestampUsec']) / 1e6, timezone.utc)
+        messages.append({
+            'id': renderer['id'],
+            'author': renderer.get('authorName', {}).get('simpleText', ''),
+            'timestamp': published.isoformat().replace('+00:00', 'Z'),
+            'message': _message_text(renderer.get('message', {}).get('runs', []))
+        })
+    return messages
+
+
+class YoutubeInnertubeChat(ChatSource):
+    """Reads live chat without a browser: one fetch of the live_chat page, then the continuation JSON endpoint
+    the page itself polls (youtubei/v1/live_chat/get_live_chat) over a pooled keep-alive session.
+    """
+    source_name = "youtube_innertube"
+
+    def __init__(self, config, live_id, base_url="https://www.youtube.com", session=None):
+        super().__init__(config)
+        self.bot_display_name = self.config.bot_display_name
+        self.base_url = base_url
+        self.url = f"{base_url}/live_chat?is_popout=1&v={live_id}"
+        self.session = session or self._create_session()
+
+        self.api_key = None
+        self.context = None
+        self.continuation = None
+        self.seen_messages = BoundedSet(self.config.chat_fetcher_seen_ids_size, max_age=self.config.chat_fetcher_seen_ids_max_age,
+                                        key=compact_id)
+        self.poll_scheduler = PollScheduler(max_idle_interval=self.config.chat_fetcher_ytinnertube_max_idle_interval,
+                                            max_backoff_interval=self.config.chat_fetcher_ytinnertube_max_backoff_interval)
+
+        self.error_count = 0
+        self.MAX_ERRORS = 5
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config, bot):
+        return cls(config, bot.live_id)
+
+    @staticmethod
+    def _create_session():
+        session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=None)
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retries))
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retries))
+        session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
+        return session
+
+    def _queue_messages(self, messages, record_latency=True):
+        new_messages = 0
+        for message in messages:
+            if message['id'] in self.seen_messages:
+                continue
+            self.seen_messages.add(message['id'])
+            if message['author'] == self.bot_display_name:
+                continue
+            if not self.put_message(message):
+                break
+            new_messages += 1
+            if record_latency:
+                published = datetime.fromisoformat(message['timestamp'].replace('Z', '+00:00'))
+                self.poll_scheduler.record_latency(published.timestamp())
+        return new_messages
+
+    def load_page(self):
+        """Fetch the live_chat page once for the API key, client context, first continuation and chat backlog."""
+        logger.info(f"Loading {self.url}")
+        response = self.session.get(self.url, timeout=10)
+        response.raise_for_status()
+        self.api_key, self.context, chat_data = parse_live_chat_page(response.text)
+        self.continuation, timeout = parse_continuation(chat_data)
+        # The backlog's age isn't our latency
+        self._queue_messages(parse_chat_actions(chat_data.get('actions', [])), record_latency=False)
+        self.poll_scheduler.record_poll(1, timeout)
+
+    def fetch_messages(self):
+        """Poll the continuation endpoint once, queue the new messages and return how many there were."""
+        response = self.session.post(f"{self.base_url}/youtubei/v1/live_chat/get_live_chat",
+                                     params={"key": self.api_key, "prettyPrint": "false"},
+                                     json={"context": self.context, "continuation": self.continuation},
+                                     timeout=10)
+        response.raise_for_status()
+        chat_data = response.json().get('continuationContents', {}).get('liveChatContinuation')
+        if chat_data is None:
+            raise ValueError("Live chat continuation missing from the response, the stream has probably ended.")
+
+        continuation, timeout = parse_continuation(chat_data)
+        if continuation:
+            self.continuation = continuation
+        new_messages = self._queue_messages(parse_chat_actions(chat_data.get('actions', [])))
+        self.poll_scheduler.record_poll(new_messages, timeout)
+        self.error_count = 0
+        return new_messages
+
+    def run_chat(self):
+        try:
+            self.load_page()
+        except Exception as e:
+            logger.error(f"Error while loading live chat: {e}", exc_info=True)
+            self.stop_event.set()
+            return
+
+        while not self.stop_event.wait(self.poll_scheduler.next_interval()):
+            try:
+                self.fetch_messages()
+            except Exception as e:
+                # An unexpected payload shape counts towards MAX_ERRORS like a network error, it doesn't end the thread
+                logger.error(f"Error while fetching live chat: {e}", exc_info=not isinstance(e, requests.RequestException))
+                self.error_count += 1
+                self.poll_scheduler.record_error()
+                if self.error_count >= self.MAX_ERRORS:
+                    logger.error("Max errors reached. Exiting innertube chat fetcher.")
+                    self.stop_event.set()
+
+    def log_stats(self):
+        self.poll_scheduler.log_stats("YoutubeInnertubeChat")
+        self.seen_messages.log_stats("YoutubeInnertubeChat")
+
+    def start_threaded(self):
+        self.thread = threading.Thread(target=self.run_chat)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.session.close()
@@ -43,17 +43,59 @@ class Config:
                 self.youtube_live_id = config.get('Youtube', 'live_id', fallback=None)
 
             self.youtube_api_send_chat = config.getboolean('Youtube', 'send_chat', fallback=False)
+            # Seconds before the cached liveBroadcasts lookup (live id, chat id, status) is refreshed
+            self.youtube_broadcast_cache_ttl = config.getfloat('Youtube', 'broadcast_cache_ttl', fallback=300)
             self.bot_display_name = config.get('Youtube.ChannelInfo', 'bot_display_name', fallback=None)
             if self.bot_display_name is None:
                 raise ValueError("YouTube bot display name not found in config.ini!")
         except configparser.NoSectionError:
             logging.error("YoutubeChannelInfo section not found in config.ini!")
 
+        # YouTube Data API quota
+        try:
+            self.youtube_quota_daily_limit = config.getint('Youtube.Quota', 'daily_limit', fallback=10000)
+            self.youtube_quota_state_file = config.get('Youtube.Quota', 'state_file', fallback='yt_quota_state.json')
+            # Units held back from chat polling for sending messages and broadcast lookups
+            self.youtube_quota_reserve = config.getint('Youtube.Quota', 'reserve', fallback=500)
+            # Polling is paced so the quota lasts this long
+            self.youtube_quota_stream_duration_hours = config.getfloat('Youtube.Quota', 'stream_duration_hours', fallback=4)
+        except configparser.NoSectionError:
+            logging.error("Youtube.Quota section not found in config.ini!")
+
         # ChatFetchers
         try:
             self.chat_fetcher_ytscraper_enabled = config.getboolean('ChatFetchers.YTScraper', 'enabled', fallback=False)
+            # 'push' drains a MutationObserver buffer every drain_interval seconds, 'poll' re-reads the page in a loop
+            self.chat_fetcher_ytscraper_mode = config.get('ChatFetchers.YTScraper', 'mode', fallback='push')
+            self.chat_fetcher_ytscraper_drain_interval = config.getfloat('ChatFetchers.YTScraper', 'drain_interval', fallback=1.0)
+            # 'lean' runs headless without images, fonts or media, 'full' is a regular visible Chrome window
+            self.chat_fetcher_ytscraper_profile = config.get('ChatFetchers.YTScraper', 'profile', fallback='lean')
+            self.chat_fetcher_ytscraper_user_data_dir = config.get('ChatFetchers.YTScraper', 'user_data_dir', fallback='chrome_profile')
+            # Random scrolling and mouse movement in the background, every humanize_interval seconds on average
+            self.chat_fetcher_ytscraper_humanize = config.getboolean('ChatFetchers.YTScraper', 'humanize', fallback=True)
+            self.chat_fetcher_ytscraper_humanize_interval = config.getfloat('ChatFetchers.YTScraper', 'humanize_interval', fallback=10)
             self.chat_fetcher_ytapi_enabled = config.getboolean('ChatFetchers.YTAPI', 'enabled', fallback=False)
+            # Seconds, the poll interval stretches up to these while chat is idle / the API is erroring
+            self.chat_fetcher_ytapi_max_idle_interval = config.getfloat('ChatFetchers.YTAPI', 'max_idle_interval', fallback=15)
+            self.chat_fetcher_ytapi_max_backoff_interval = config.getfloat('ChatFetchers.YTAPI', 'max_backoff_interval', fallback=300)
             self.chat_fetcher_startup_delay = config.getint('ChatFetchers', 'startup_delay', fallback=30)
+            self.chat_fetcher_queue_size = config.getint('ChatFetchers', 'queue_size', fallback=1000)
+            # Message ids each fetcher remembers to skip repeats: at most this many, and (API only) for this many seconds
+            self.chat_fetcher_seen_ids_size = config.getint('ChatFetchers', 'seen_ids_size', fallback=100000)
+            self.chat_fetcher_seen_ids_max_age = config.getfloat('ChatFetchers', 'seen_ids_max_age', fallback=3600)
+            # Comma separated source names, falls back to the per-fetcher enabled flags
+            sources = config.get('ChatFetchers', 'sources', fallback='')
+            self.chat_fetcher_sources = [source.strip() for source in sources.split(',') if source.strip()]
+            if not self.chat_fetcher_sources:
+                if self.chat_fetcher_ytapi_enabled:
+                    self.chat_fetcher_sources.append('ytapi')
+                if self.chat_fetcher_ytscraper_enabled:
+                    self.chat_fetcher_sources.append('ytscraper')
+            # Seconds, like the YTAPI settings: the poll interval stretches up to these while idle / erroring
+            self.chat_fetcher_ytinnertube_max_idle_interval = config.getfloat('ChatFetchers.YTInnertube', 'max_idle_interval', fallback=5)
+            self.chat_fetcher_ytinnertube_max_backoff_interval = config.getfloat('ChatFetchers.YTInnertube', 'max_backoff_interval', fallback=60)
+            self.chat_fetcher_synthetic_rate = config.getfloat('ChatFetchers.Synthetic', 'rate', fallback=10)
+            self.chat_fetcher_synthetic_authors = config.getint('ChatFetchers.Synthetic', 'authors', fallback=50)
         except configparser.NoSectionError:
             logging.error("ChatFetchers section not found in config.ini!")
 
@@ -77,6 +119,8 @@ class Config:
             self.prompt_history_refresh_seconds = config.getint('ChatResponse', 'prompt_history_refresh_seconds', fallback=300)
             self.chat_response_enabled = config.getboolean('ChatResponse', 'enabled', fallback=True)
             self.chat_response_method = config.get('ChatResponse', 'method', fallback='ChatGPT')
+            self.pipeline_queue_size = config.getint('ChatResponse', 'pipeline_queue_size', fallback=5)
+            self.pipeline_stats_interval = config.getint('ChatResponse', 'pipeline_stats_interval', fallback=60)
         except configparser.NoSectionError:
             logging.error("ChatResponse section not found in config.ini!")
 
@@ -95,9 +139,16 @@ class Config:
             self.context_parser_greeting_words = list(set([item.strip() for item in config.get('ChatResponse.ContextParser', 'greeting_words', fallback='').split(',') if item]))
             self.context_parser_question_starts = list(set([item.strip() for item in config.get('ChatResponse.ContextParser', 'question_starts', fallback='').split(',') if item]))
             self.context_parser_short_message_threshold = config.getint('ChatResponse.ContextParser', 'short_message_threshold', fallback=3)
+            self.context_parser_history_size = config.getint('ChatResponse.ContextParser', 'history_size', fallback=10)
+            self.context_parser_sentiment_method = config.get('ChatResponse.ContextParser', 'sentiment_method', fallback='textblob')
+            self.context_parser_batch_size = config.getint('ChatResponse.ContextParser', 'batch_size', fallback=64)
+            self.context_parser_n_process = config.getint('ChatResponse.ContextParser', 'n_process', fallback=1)
+            self.context_parser_keywords = list(set([item.strip().lower() for item in
+                                                     config.get('ChatResponse.ContextParser', 'keywords',
+                                                                fallback='hopii,hoppi,hoppy,hopi').split(',') if item.strip()]))
             self.context_parser_author_allowlist = list(set([item.strip() for item in
                                                             config.get('ChatResponse.ContextParser', 'author_allowlist',
-                                                                       fallback='').split(',') if item]))
+                                                                       fallback='').split(',') if item.strip()]))
         except configparser.NoSectionError:
             logging.error("ContextParser section not found in config.ini!")
 
@@ -127,6 +178,10 @@ class Config:
         # Chatmerger
         try:
             self.chatmerger_message_history = config.getint('ChatMerger', 'message_history', fallback=50)
+            self.chatmerger_match_window = config.getfloat('ChatMerger', 'match_window', fallback=120)
+            # Seconds new messages are held to emit them in timestamp order. Covers jitter within a source, it takes
+            # the API's poll interval (5-15s) to also order API-only messages among the scraper's
+            self.chatmerger_reorder_delay = config.getfloat('ChatMerger', 'reorder_delay', fallback=1.0)
         except configparser.NoSectionError:
             logging.error("ChatMerger section not found in config.ini!")
 
@@ -135,6 +190,9 @@ class Config:
             self.chat_logging_enabled = config.getboolean('ChatLogging', 'enabled', fallback=False)
             self.chat_logging_directory = config.get('ChatLogging', 'directory', fallback='chat_logs')
             self.chat_logging_file_write_frequency = config.getint('ChatLogging', 'file_write_frequency', fallback=30)
+            self.chat_logging_fsync_policy = config.get('ChatLogging', 'fsync_policy', fallback='flush')
+            # Also log every source's messages as received, one file per source, for benchmarks.merger_match_rate
+            self.chat_logging_record_sources = config.getboolean('ChatLogging', 'record_sources', fallback=False)
         except configparser.NoSectionError:
             logging.error("ChatLogging section not found in config.ini!")
 
@@ -0,0 +1,101 @@
+import json
+import os
+from lib.logger import logger
+
+# never: leave it to the OS, flush: fsync after every batched flush, always: fsync after every entry
+FSYNC_POLICIES = ("never", "flush", "always")
+
+
+class ChatLogWriter:
+    """Append-only JSON Lines chat log.
+
+    Every entry is a single line, so writes cost the same no matter how long the session is and a crash
+    can at most leave a truncated last line (which read_chat_log skips).
+    """
+
+    def __init__(self, path, fsync_policy="flush", buffer_size=64 * 1024):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy '{fsync_policy}', expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self._file = open(path, 'a', encoding='utf-8', buffering=buffer_size)
+
+    def write(self, entry):
+        self._file.write(json.dumps(entry, default=str) + "\n")
+        if self.fsync_policy == "always":
+            self._sync()
+
+    def flush(self):
+        if self.fsync_policy == "never":
+            self._file.flush()
+        else:
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def read_chat_log(path):
+    """Yield chat log entries one at a time.
+
+    Reads JSON Lines logs lazily. Legacy logs (a single JSON array written by json.dump) are still supported
+    but have to be loaded whole.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if is_legacy_log(f):
+            yield from json.load(f)
+            return
+
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping unreadable line {line_number} in {path} (likely a partial write).")
+
+
+def is_legacy_log(f):
+    """Peek at the first non-whitespace character, legacy logs start with '['."""
+    while True:
+        ch = f.read(1)
+        if not ch or not ch.isspace():
+            break
+    f.seek(0)
+    return ch == '['
+
+
+def convert_chat_log(source_path, destination_path):
+    """Convert a chat log (either format) to JSON Lines. Returns the number of entries written."""
+    writer = ChatLogWriter(destination_path, fsync_policy="never")
+    count = 0
+    try:
+        for entry in read_chat_log(source_path):
+            writer.write(entry)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+if __name__ == '__main__':
+    # Run from the repo root:
+    #   python -m lib.chat_log convert chat_logs/20230918_143330.json chat_logs/20230918_143330.jsonl
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Chat log utilities")
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Convert a chat log to JSON Lines")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("destination")
+    args = arg_parser.parse_args()
+
+    written = convert_chat_log(args.source, args.destination)
+    logger.info(f"Converted {written} entries to {args.destination}")
@@ -1,57 +1,171 @@
 import hashlib
+import heapq
+import itertools
 import queue
+import threading
+import time
+from collections import Counter, deque
 from lib.logger import logger
-from collections import deque
+from lib.dedup import BoundedSet
+from lib.timestamps import timestamp_to_epoch
 
 class ChatMerger:
+    """Merges the chat sources' queues into one timestamp ordered stream, emitting each chat message once.
 
-    def __init__(self, config, chat_scraper=None, youtube_chat=None):
+    The sources deliver independently, so a single drain usually holds one source's messages. New messages are
+    held in a heap for up to reorder_delay seconds, until they're reorder_delay old by their own timestamp, and
+    released in timestamp order. A message that reaches the merger more than reorder_delay after its timestamp
+    is released right away and can come out behind newer ones, 0 disables the hold.
+
+    The default hold only evens out delivery jitter within a source, and between sources about as fast as each
+    other. It doesn't reorder across sources of different latency: the API delivers a poll interval (5-15s)
+    after the fact, so an API-only message comes out behind newer scraper messages unless reorder_delay is
+    raised to the API's poll interval, which delays every message by that much.
+
+    The scraper and the API report the same message with slightly different author strings, whitespace and
+    timestamp precision. Messages are matched on normalized author + text within match_window seconds of each
+    other. The first copy to arrive is emitted and never touched again, it may already be in another thread's
+    hands. Later copies are only counted, per source, in matched_sources.
+    """
+
+    def __init__(self, config, sources, raw_message_log=None):
         self.config = config
-        self.chat_scraper = chat_scraper
-        self.youtube_chat = youtube_chat
-        self.seen_messages_hashes = deque(maxlen=self.config.chatmerger_message_history)
+        self.sources = sources
+        # Queue that gets (source name, message) for every message as its source delivered it, before merging
+        self.raw_message_log = raw_message_log
+        self.match_window = self.config.chatmerger_match_window
+        self.reorder_delay = self.config.chatmerger_reorder_delay
+
+        # Normalized key -> {'sources', 'timestamp', 'arrival'} for messages that arrived within match_window
+        self.recent_messages = {}
+        self._recent_order = deque()  # (arrival, key), oldest first, for expiry
+        self.seen_ids = BoundedSet(self.config.chatmerger_message_history)
+        # (timestamp, sequence, release time, message) for emitted messages held back for reordering
+        self.pending = []
+        self._sequence = itertools.count()  # Keeps the heap from comparing message dicts, and ties in arrival order
+        self.stats = {"received": 0, "emitted": 0, "merged": 0, "duplicates": 0}
+        self.matched_sources = Counter()  # Source -> copies it reported of messages another source emitted first
+
+        # Shared with the sources, which set it after every put so we can sleep until there's work
+        self.message_event = threading.Event()
+        for source in self.sources:
+            source.message_event = self.message_event
 
+    @staticmethod
+    def _normalize(text):
+        return " ".join(text.split()).casefold()
 
     def _hash_message(self, message):
-        """Generate a unique hash for the message based on its content."""
-        hasher = hashlib.md5()
-        hasher.update(message['author'].encode())
-        hasher.update(message['message'].encode())
-        return hasher.hexdigest()
+        """Generate a 64-bit key for the message based on its normalized author and content."""
+        hasher = hashlib.blake2b(digest_size=8)
+        hasher.update(self._normalize(message['author']).lstrip('@').encode())
+        hasher.update(b"\0")
+        hasher.update(self._normalize(message['message']).encode())
+        return int.from_bytes(hasher.digest(), "little")
+
+    def _expire(self, now):
+        cutoff = now - self.match_window
+        while self._recent_order and self._recent_order[0][0] < cutoff:
+            arrival, key = self._recent_order.popleft()
+            entry = self.recent_messages.get(key)
+            if entry and entry['arrival'] == arrival:
+                del self.recent_messages[key]
+
+    @staticmethod
+    def _message_time(message):
+        try:
+            return timestamp_to_epoch(message['timestamp'])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return time.time()
+
+    def merge(self, message, source, now=None, timestamp=None):
+        """Return the message if it's new, or None if it's a copy of one already emitted."""
+        if now is None:
+            now = time.monotonic()
+        if timestamp is None:
+            timestamp = self._message_time(message)
+        self.stats["received"] += 1
+
+        message_id = message.get('id')
+        if message_id and message_id in self.seen_ids:
+            self.stats["duplicates"] += 1
+            return None
+
+        key = self._hash_message(message)
+        entry = self.recent_messages.get(key)
+        if entry and abs(timestamp - entry['timestamp']) <= self.match_window:
+            if source in entry['sources']:
+                self.stats["duplicates"] += 1
+            else:
+                entry['sources'].add(source)
+                self.matched_sources[source] += 1
+                self.stats["merged"] += 1
+            if message_id:
+                self.seen_ids.add(message_id)
+            logger.debug("Duplicate message found: %s", message['message'])
+            return None
+
+        if message_id:
+            self.seen_ids.add(message_id)
+        message['source'] = source
+        self.recent_messages[key] = {'sources': {source}, 'timestamp': timestamp, 'arrival': now}
+        self._recent_order.append((now, key))
+        self.stats["emitted"] += 1
+        return message
 
     def get_unique_messages(self):
-        unique_messages = []
+        now = time.monotonic()
+        wall_now = time.time()
+        self._expire(now)
 
-        # Extract from scraper's message_queue
-        if self.chat_scraper:
-            while not self.chat_scraper.message_queue.empty():
-                message = self.chat_scraper.message_queue.get()
-                hash = self._hash_message(message)
-
-                if hash not in self.seen_messages_hashes:
-                    self.seen_messages_hashes.append(hash)
-                    message['source'] = 'youtube_scraper'
-                    unique_messages.append(message)
-                else:
-                    logger.debug(f"Duplicate message found: {message['message']}")
-
-        # Extract from youtube chat's message_queue
-        if self.youtube_chat:
-            while not self.youtube_chat.message_queue.empty():
-                message = self.youtube_chat.message_queue.get()
-                hash = self._hash_message(message)
-
-                if hash not in self.seen_messages_hashes:
-                    self.seen_messages_hashes.append(hash)
-                    message['source'] = 'youtube_api'
-                    unique_messages.append(message)
-                else:
-                    logger.debug(f"Duplicate message found: {message['message']}")
+        for source in self.sources:
+            for message in self._extract_messages_from_queue(source.message_queue):
+                if self.raw_message_log is not None:
+                    self.raw_message_log.put((source.source_name, dict(message)))
+                timestamp = self._message_time(message)
+                message = self.merge(message, source.source_name, now, timestamp)
+                if message:
+                    hold = min(self.reorder_delay, max(0.0, timestamp + self.reorder_delay - wall_now))
+                    heapq.heappush(self.pending, (timestamp, next(self._sequence), now + hold, message))
+
+        unique_messages = []
+        while self.pending and self.pending[0][2] <= now:
+            unique_messages.append(heapq.heappop(self.pending)[3])
 
         if len(unique_messages) > 0:
-            logger.debug(f"Found {len(unique_messages)} unique messages")
+            logger.debug("Found %d unique messages", len(unique_messages))
         return unique_messages
 
+    def reset(self):
+        """Forget every message seen so far, including the ones still held for reordering."""
+        self.pending.clear()
+        self.recent_messages.clear()
+        self._recent_order.clear()
+        self.seen_ids.clear()
+
+    def log_stats(self):
+        # Share of emitted messages that were also reported by another source
+        emitted = self.stats["emitted"]
+        match_rate = self.stats["merged"] / emitted if emitted else 0.0
+        matched_by = ", ".join(f"{source} {count}" for source, count in self.matched_sources.most_common())
+        logger.info(f"ChatMerger stats - {self.stats['received']} received, {emitted} emitted, "
+                    f"{self.stats['merged']} matched across sources ({match_rate:.1%}{', ' + matched_by if matched_by else ''}), "
+                    f"{self.stats['duplicates']} same-source duplicates, {len(self.pending)} held for reordering")
+
+    def wait_for_messages(self, timeout=None):
+        """Block until a fetcher signals new messages, a held message is due (or timeout), then return the unique ones."""
+        if self.pending:
+            until_release = max(0.0, self.pending[0][2] - time.monotonic())
+            timeout = until_release if timeout is None else min(timeout, until_release)
+        self.message_event.wait(timeout)
+        # Clear before draining, a put that lands after this point sets the event again for the next call
+        self.message_event.clear()
+        return self.get_unique_messages()
+
+    def wake(self):
+        """Wake up a blocked wait_for_messages call, e.g. on shutdown."""
+        self.message_event.set()
+
     def _extract_messages_from_queue(self, q):
         """Extract all messages from a queue until it's empty."""
         messages = []
@@ -0,0 +1,134 @@
+import bisect
+import json
+import threading
+import time
+from lib.chat_log import read_chat_log, is_legacy_log
+from lib.logger import logger
+from lib.timestamps import timestamp_to_epoch
+
+
+class ChatReplayer:
+    """Streams a recorded chat log into a message queue, reproducing the recorded gaps between messages.
+
+    speed scales the gaps (2 plays twice as fast), a speed of 0 replays as fast as possible. start_offset skips
+    the first N seconds of the recording, using a sparse byte offset index so JSON Lines logs don't have to be
+    parsed up to that point.
+    """
+    INDEX_STRIDE = 100  # Entries between index points
+
+    def __init__(self, path, speed=1.0, start_offset=0.0, stop_event=None):
+        if speed < 0:
+            raise ValueError("Replay speed must be 0 (max rate) or positive.")
+        self.path = path
+        self.speed = speed
+        self.start_offset = start_offset
+        self.stop_event = stop_event or threading.Event()
+        self.index = None  # [(seconds into the recording, byte offset)], seconds are non-decreasing
+
+        self.replayed = 0
+        self.max_lag = 0.0  # Worst delay between an entry's scheduled and actual put, in seconds
+
+    def _is_legacy(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return is_legacy_log(f)
+
+    def build_index(self):
+        """Scan the log once, recording the byte offset of every INDEX_STRIDE-th entry."""
+        self.index = []
+        base = None
+        elapsed = 0.0
+        count = 0
+        with open(self.path, 'rb') as f:
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                try:
+                    entry = json.loads(line)
+                    timestamp = timestamp_to_epoch(entry['timestamp'])
+                except (ValueError, KeyError, TypeError):
+                    offset += len(line)
+                    continue
+                if base is None:
+                    base = timestamp
+                # Keep the index monotonic even if the recording has out of order timestamps
+                elapsed = max(elapsed, timestamp - base)
+                if count % self.INDEX_STRIDE == 0:
+                    self.index.append((elapsed, offset))
+                count += 1
+                offset += len(line)
+        return self.index
+
+    def _base_timestamp(self):
+        for entry in read_chat_log(self.path):
+            try:
+                return timestamp_to_epoch(entry['timestamp'])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return None
+
+    def _read_entries(self):
+        if self._is_legacy():
+            # Legacy JSON array logs can't be seeked into, they're read whole and skipped through
+            yield from read_chat_log(self.path)
+            return
+
+        start = 0
+        if self.start_offset > 0:
+            if self.index is None:
+                self.build_index()
+            position = bisect.bisect_right([point[0] for point in self.index], self.start_offset) - 1
+            if position > 0:
+                start = self.index[position][1]
+
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable entry in {self.path} at byte {start} + line {line_number}.")
+
+    def entries(self):
+        """Yield (seconds into the recording, entry) for every entry at or after start_offset."""
+        base = self._base_timestamp()
+        elapsed = 0.0
+        for entry in self._read_entries():
+            try:
+                elapsed = timestamp_to_epoch(entry['timestamp']) - base
+            except (ValueError, KeyError, TypeError):
+                pass  # Unparseable timestamps are replayed right after the previous entry
+            if elapsed < self.start_offset:
+                continue
+            yield elapsed, entry
+
+    def replay(self, message_queue):
+        """Put every entry onto message_queue on schedule. Returns the number of entries replayed."""
+        rate = f"{self.speed}x" if self.speed else "max rate"
+        logger.info(f"Replaying {self.path} at {rate} from {self.start_offset}s")
+        start_time = time.perf_counter()
+        first_elapsed = None
+        for elapsed, entry in self.entries():
+            if first_elapsed is None:
+                first_elapsed = elapsed
+
+            # Schedule against the replay start rather than the previous entry, so waits don't accumulate drift
+            if self.speed:
+                scheduled = start_time + (elapsed - first_elapsed) / self.speed
+                remaining = scheduled - time.perf_counter()
+                if remaining > 0 and self.stop_event.wait(remaining):
+                    break
+                self.max_lag = max(self.max_lag, time.perf_counter() - scheduled)
+            if self.stop_event.is_set():
+                break
+
+            message_queue.put({
+                "author": entry['author'],
+                "timestamp": entry['timestamp'],
+                "message": entry['message']
+            })
+            self.replayed += 1
+
+        duration = time.perf_counter() - start_time
+        logger.info(f"Replayed {self.replayed} messages in {duration:.1f}s (max lag {self.max_lag * 1000:.1f} ms)")
+        return self.replayed
@@ -1,46 +1,133 @@
 import spacy
 import subprocess
 import sys
-from lib.logger import logger
+from lib.logger import logger, LazyLog
 from collections import deque
-import Levenshtein
+from rapidfuzz import fuzz, process
 import string
 from textblob import TextBlob
+from textblob.en import sentiment as pattern_lexicon
 import datetime
+import re
 from dateutil.parser import parse
 from dateutil.tz import gettz
 
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+
+def clean_text(text):
+    return text.translate(_PUNCTUATION_TABLE).lower().strip()
+
+
+def parse_timestamp(timestamp):
+    if type(timestamp) == str:
+        return parse(timestamp, ignoretz=True)
+    return timestamp
+
+
+class HistoryRecord:
+    """What ContextParser keeps of a message in its history: only the features the history checks read.
+
+    Holds no spaCy Doc, config or nlp references, so a deep history stays small.
+    """
+    __slots__ = ("author", "timestamp", "text", "named_entities", "is_greeting")
+
+    def __init__(self, author, timestamp, text, named_entities, is_greeting):
+        self.author = author
+        self.timestamp = timestamp
+        self.text = text
+        self.named_entities = named_entities
+        self.is_greeting = is_greeting
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(message.author, message.timestamp, message.text, tuple(message.named_entities), message.is_greeting)
+
+    def __repr__(self):
+        return f"HistoryRecord(text='{self.text}')"
+
+
+class PrefilteredMessage:
+    """A message rejected (or accepted) before NLP, keeping just what the history checks need.
+
+    It is never parsed, so it has no named entities and greetings are matched on whitespace tokens.
+    """
+    named_entities = ()
+
+    def __init__(self, config, message):
+        self.config = config
+        self.text = clean_text(message['message'])
+        self.author = message['author']
+        self.timestamp = parse_timestamp(message['timestamp'])
+        self._is_greeting = None
+
+    @property
+    def is_greeting(self):
+        if self._is_greeting is None:
+            tokens = self.text.split()
+            self._is_greeting = any(greet in tokens for greet in self.config.context_parser_greeting_words)
+        return self._is_greeting
+
+    def __repr__(self):
+        return f"PrefilteredMessage(text='{self.text}')"
+
+
 class Message:
-    def __init__(self, config, message, nlp):
+    NEGATIONS = {"no", "not", "nt", "never"}
+
+    def __init__(self, config, message, nlp, doc=None):
         self.config = config
-        self.install_textblob_corpora()
         self.text = self.clean_text(message['message'])
         self.author = message['author']
         self._nlp = nlp
-        if type(message['timestamp']) == str:
-            self.timestamp = parse(message['timestamp'], ignoretz=True)
-        else:
-            self.timestamp = message['timestamp']
-        self._tokens = None
+        self.timestamp = parse_timestamp(message['timestamp'])
         self._is_greeting = None
-        self._is_question = None
-        self.doc = self._nlp(self.text)
-        self.blob = TextBlob(self.text)
-
-    @classmethod
-    def install_textblob_corpora(cls):
-        try:
-            # Try creating a TextBlob to see if the corpora are installed
-            _ = TextBlob("test")
-        except Exception:
-            cmd = [sys.executable, "-m", "textblob.download_corpora"]
-            logger.warning(f"TextBlob corpora not found. Installing using command: {' '.join(cmd)}")
-            subprocess.check_call(cmd)
+        self._sentiment = None
+        # A doc can be passed in when messages are parsed in bulk with nlp.pipe
+        self.doc = doc if doc is not None else self._nlp(self.text)
+        self._extract_features()
+
+    def _extract_features(self):
+        """Walk the parsed Doc once and keep every feature the properties below need."""
+        question_starts = self.config.context_parser_question_starts
+        self._tokens = []
+        self._subject = None
+        first_noun = None
+        has_aux = has_nsubj = has_question_start = False
+        self._contains_url = self._contains_email = False
+
+        for token in self.doc:
+            lower = token.lower_
+            self._tokens.append(lower)
+            dep = token.dep_
+            if dep == "aux":
+                has_aux = True
+            elif dep == "nsubj":
+                has_nsubj = True
+            if self._subject is None and dep in ("nsubj", "nsubjpass"):
+                self._subject = token.text
+            if first_noun is None and token.pos_ == "NOUN":
+                first_noun = token.text
+            if lower in question_starts:
+                has_question_start = True
+            if token.like_url:
+                self._contains_url = True
+            if token.like_email:
+                self._contains_email = True
+
+        # If no nominal subject is found, fall back to the first noun
+        if self._subject is None:
+            self._subject = first_noun
+
+        self._named_entities = [ent.text for ent in self.doc.ents]
+        self._is_question = (
+                any(sent.text.endswith('?') for sent in self.doc.sents) or
+                has_aux and has_nsubj or
+                has_question_start
+        )
 
     @property
     def tokens(self):
-        if self._tokens is None:
-            self._tokens = [token.text.lower() for token in self._nlp(self.text)]
         return self._tokens
 
     @property
@@ -52,14 +139,6 @@ class Message:
 
     @property
     def is_question(self):
-        if self._is_question is None:
-            question_starts = self.config.context_parser_question_starts
-
-            self._is_question = (
-                    any(sent.text.endswith('?') for sent in self.doc.sents) or
-                    any(token.dep_ == "aux" for token in self.doc) and any(token.dep_ == "nsubj" for token in self.doc) or
-                    any(token.text.lower() in question_starts for token in self.doc)
-            )
         return self._is_question
 
     @property
@@ -73,36 +152,49 @@ class Message:
 
     @property
     def named_entities(self):
-        return [ent.text for ent in self.doc.ents]
+        return self._named_entities
 
     @property
     def contains_url(self):
-        return any(token.like_url for token in self.doc)
+        return self._contains_url
 
     @property
     def contains_email(self):
-        return any(token.like_email for token in self.doc)
+        return self._contains_email
 
     @property
     def subject(self):
-        # Extract nominal subjects
-        nsubj_tokens = [token.text for token in self.doc if token.dep_ in ["nsubj", "nsubjpass"]]
-        if nsubj_tokens:
-            return nsubj_tokens[0]  # Returning the first nominal subject
-
-        # If no nominal subject is found, fall back to any noun
-        noun_tokens = [token.text for token in self.doc if token.pos_ == "NOUN"]
-        if noun_tokens:
-            return noun_tokens[0]  # Returning the first noun
-
-        return None  # No subject found
+        # First nominal subject, else the first noun, else None
+        return self._subject
 
     @property
     def sentiment(self):
-        return self.blob.sentiment.polarity
+        # Only computed when asked for (verbose logging), then cached
+        if self._sentiment is None:
+            if self.config.context_parser_sentiment_method == "lexicon":
+                self._sentiment = self._lexicon_polarity()
+            else:
+                self._sentiment = TextBlob(self.text).sentiment.polarity
+        return self._sentiment
+
+    def _lexicon_polarity(self):
+        """Average polarity of the words in TextBlob's sentiment lexicon, scored on the existing Doc."""
+        scores = []
+        negated = False
+        for token in self.doc:
+            word = token.lower_
+            if word in self.NEGATIONS:
+                negated = True
+                continue
+            entry = pattern_lexicon.get(word)
+            if entry:
+                polarity = entry[None][0]
+                scores.append(-polarity if negated else polarity)
+            negated = False
+        return sum(scores) / len(scores) if scores else 0.0
 
     def clean_text(self, text):
-        return ''.join(ch for ch in text if ch not in string.punctuation).lower().strip()
+        return clean_text(text)
 
     def __repr__(self):
         return f"Message(text='{self.text}')"
@@ -119,7 +211,8 @@ class Message:
 
 class ContextParser:
     MODEL_NAME = "en_core_web_sm"
-    HISTORY_SIZE = 10
+    # is_relevant only needs tags/POS, the dependency parse (deps and sentences) and entities
+    DISABLED_PIPES = ["lemmatizer"]
 
     @classmethod
     def install_spacy_model(cls):
@@ -131,16 +224,41 @@ class ContextParser:
             logger.warning(f"{cls.MODEL_NAME} not found. Installing using command: {' '.join(cmd)}")
             subprocess.check_call(cmd)
 
+    @classmethod
+    def install_textblob_corpora(cls):
+        try:
+            # Try creating a TextBlob to see if the corpora are installed
+            _ = TextBlob("test")
+        except Exception:
+            cmd = [sys.executable, "-m", "textblob.download_corpora"]
+            logger.warning(f"TextBlob corpora not found. Installing using command: {' '.join(cmd)}")
+            subprocess.check_call(cmd)
+
     def __init__(self, config):
         self.config = config
-        self.nlp = spacy.load(self.MODEL_NAME)
-        self.message_history = deque(maxlen=self.HISTORY_SIZE)
+        self.nlp = spacy.load(self.MODEL_NAME, disable=self.DISABLED_PIPES)
+        self.message_history = deque(maxlen=self.config.context_parser_history_size)
+        # Entity -> number of messages in message_history mentioning it, kept in step with the deque
+        self.entity_counts = {}
+        # An empty keyword would make the pattern match every message
+        keywords = [keyword for keyword in self.config.context_parser_keywords if keyword]
+        self.keyword_pattern = re.compile("|".join(re.escape(keyword) for keyword in keywords)) if keywords else None
 
     def is_similar(self, string1, string2, threshold=0.85):
         """Determine if two strings are similar."""
-        similarity = Levenshtein.ratio(string1.lower(), string2.lower())
+        similarity = fuzz.ratio(string1.lower(), string2.lower()) / 100
         return similarity >= threshold
 
+    def find_similar_in_history(self, text, threshold=0.85):
+        """Return the most similar history text at or above threshold, or None.
+
+        Scores the whole history in one rapidfuzz call. The cutoff lets it skip pairs that can't reach the
+        threshold, and it stops at the first exact match. History texts are already lowercased by clean_text.
+        """
+        match = process.extractOne(text, [message.text for message in self.message_history],
+                                   scorer=fuzz.ratio, processor=None, score_cutoff=threshold * 100)
+        return match[0] if match else None
+
     def is_directed_greeting(self, message, bot_name):
         """Check if the text is a greeting directed towards the bot."""
         cleaned_bot_name = message.clean_text(bot_name)
@@ -152,7 +270,7 @@ class ContextParser:
     def greetings_in_history(self, limit=3, time_limit=None):
         """Count the number of greetings in the recent message history."""
         if time_limit is None:
-            datetime.timedelta(minutes=self.config.context_parser_greeting_time_limit)
+            time_limit = datetime.timedelta(minutes=self.config.context_parser_greeting_time_limit)
 
         now = datetime.datetime.utcnow()
 
@@ -165,9 +283,7 @@ class ContextParser:
 
     def has_named_entities(self, message):
         """Check if the current message talks about previously mentioned entities."""
-        current_entities = set(message.named_entities)
-        previous_entities = {ent.text for msg in self.message_history for ent in msg.doc.ents}
-        return bool(current_entities & previous_entities)
+        return any(entity in self.entity_counts for entity in message.named_entities)
 
     def is_reply(self, new_message):
         # If the message history is empty, it's not a reply
@@ -180,19 +296,16 @@ class ContextParser:
         # Temporal Proximity (for this, we'll consider a time window of 5 minutes)
         time_window = datetime.timedelta(seconds=self.config.context_parser_reply_time_limit)
         if new_message.timestamp - self.message_history[-1].timestamp <= time_window:
-            logger.verbose(f"Message '{new_message.text}' is likely a reply as it was sent within {time_window} of the previous message.")
+            logger.verbose("Message '%s' is likely a reply as it was sent within %s of the previous message.", new_message.text, time_window)
             return True
 
         # Named Entity Matching
-        current_entities = set(new_message.named_entities)
-        previous_entities = {ent.text for msg in self.message_history for ent in msg.doc.ents}
-        if current_entities & previous_entities:
+        if any(entity in self.entity_counts for entity in new_message.named_entities):
             return True
 
         # Levenshtein Similarity (we'll consider a similarity threshold of 0.6 for replies)
-        for previous_message in self.message_history:
-            if self.is_similar(new_message.text, previous_message.text, threshold=0.6):
-                return True
+        if self.find_similar_in_history(new_message.text, threshold=0.6) is not None:
+            return True
 
         # Dependency Matching - checking for unresolved pronouns
         pronouns = ["it", "he", "she", "they"]
@@ -201,23 +314,70 @@ class ContextParser:
 
         return False
 
-    def is_relevant(self, message, bot_name="bot_username"):
-        """Check if the text is relevant to the conversation."""
-        message = Message(self.config, message, self.nlp)
-        logger.verbose(f"Message properties: {message.get_properties()}")
-        self.add_to_history(message)
-
-        logger.debug(f"message author: {message.author} - self.config.context_parser_author_allowlist: {str(self.config.context_parser_author_allowlist)}")
-        if message.author in self.config.context_parser_author_allowlist:
+    def _prefilter(self, prefiltered):
+        """Cheap checks that settle a message without NLP. Returns True/False, or None if it needs the full parse."""
+        logger.debug("message author: %s - self.config.context_parser_author_allowlist: %s", prefiltered.author, self.config.context_parser_author_allowlist)
+        if prefiltered.author in self.config.context_parser_author_allowlist:
             logger.verbose(f"Message author is in the allowlist. Ignoring context parser.")
             return True
-        
-        # Check if the message contains any of the specified keywords
-        keywords = ["hopii", "hoppi", "hoppy", "hopi"]
-        if not any(keyword in message.text for keyword in keywords):
+
+        # Check if the message contains any of the configured keywords
+        if self.keyword_pattern and not self.keyword_pattern.search(prefiltered.text):
             logger.verbose(f"Message does not contain any of the specified keywords.")
             return False
+        return None
+
+    def classify_batch(self, messages, bot_name="bot_username"):
+        """Check the relevance of a burst of messages, returning one bool per message.
+
+        Messages that get past the prefilter are parsed together with nlp.pipe. The history dependent rules then
+        run in arrival order, so each message sees the history as it was when it arrived. A message whose check
+        raises is logged and let through on its own, the rest of the burst is classified as usual.
+        """
+        prefiltered, decisions = [], []
+        for message in messages:
+            try:
+                record = PrefilteredMessage(self.config, message)
+                decision = self._prefilter(record)
+            except Exception as e:
+                logger.error(f"Error while checking relevance of message {message}: {e}", exc_info=True)
+                record, decision = None, True
+            prefiltered.append(record)
+            decisions.append(decision)
+
+        texts = [record.text for record, decision in zip(prefiltered, decisions) if decision is None]
+        # None makes Message parse the text itself
+        docs = [None] * len(texts)
+        if len(texts) > 1:
+            try:
+                docs = list(self.nlp.pipe(texts, batch_size=self.config.context_parser_batch_size,
+                                          n_process=self.config.context_parser_n_process))
+            except Exception as e:
+                logger.error(f"Error while parsing a batch of {len(texts)} messages, parsing them one by one: {e}",
+                             exc_info=True)
+        docs = iter(docs)
+
+        results = []
+        for message, record, decision in zip(messages, prefiltered, decisions):
+            if decision is None:
+                doc = next(docs)
+                try:
+                    decision = self._check_parsed_message(Message(self.config, message, self.nlp, doc=doc), bot_name)
+                except Exception as e:
+                    logger.error(f"Error while checking relevance of message {message}: {e}", exc_info=True)
+                    decision = True
+            elif record is not None:
+                self.add_to_history(record)
+            results.append(decision)
+        return results
+
+    def is_relevant(self, message, bot_name="bot_username"):
+        """Check if the text is relevant to the conversation."""
+        return self.classify_batch([message], bot_name)[0]
 
+    def _check_parsed_message(self, message, bot_name):
+        logger.verbose("Message properties: %s", LazyLog(message.get_properties))
+        self.add_to_history(message)
 
         if message.is_greeting:
             logger.verbose(f"Message is a greeting.")
@@ -247,10 +407,23 @@ class ContextParser:
             if message.is_question:
                 logger.verbose(f"Message is a question.")
             if message.subject:
-                logger.verbose(f"Message subject is {message.subject}")
+                logger.verbose("Message subject is %s", message.subject)
             return True
 
         return False
 
     def add_to_history(self, message):
+        message = HistoryRecord.from_message(message)
+        if len(self.message_history) == self.message_history.maxlen:
+            # The deque is about to drop its oldest message, take its entities out of the index first
+            for entity in set(self.message_history[0].named_entities):
+                self.entity_counts[entity] -= 1
+                if not self.entity_counts[entity]:
+                    del self.entity_counts[entity]
         self.message_history.append(message)
+        for entity in set(message.named_entities):
+            self.entity_counts[entity] = self.entity_counts.get(entity, 0) + 1
+
+    def clear_history(self):
+        self.message_history.clear()
+        self.entity_counts.clear()
@@ -0,0 +1,71 @@
+import hashlib
+import sys
+import time
+from collections import deque
+from lib.logger import logger
+
+
+def compact_id(message_id):
+    """64-bit int key for a message id string, a fraction of the memory of the ~70 character id itself."""
+    return int.from_bytes(hashlib.blake2b(message_id.encode(), digest_size=8).digest(), "little")
+
+
+class BoundedSet:
+    """A set that holds at most maxlen items, forgetting the oldest first.
+
+    Membership is a hash lookup and eviction pops the front of an insertion order deque, so add and
+    `in` are both O(1) regardless of size. With max_age, items are also forgotten max_age seconds after
+    they were added. key, if given, is applied to items before they're stored or looked up (e.g. compact_id).
+    """
+
+    def __init__(self, maxlen, max_age=None, key=None, clock=time.monotonic):
+        self.maxlen = maxlen
+        self.max_age = max_age
+        self.key = key
+        self.clock = clock
+        self._items = {}  # item -> time added
+        self._order = deque()
+
+    def __contains__(self, item):
+        if self.key:
+            item = self.key(item)
+        added = self._items.get(item)
+        if added is None:
+            return False
+        return self.max_age is None or self.clock() - added <= self.max_age
+
+    def __len__(self):
+        return len(self._items)
+
+    def _expire(self, now):
+        cutoff = now - self.max_age
+        while self._order and self._items[self._order[0]] < cutoff:
+            del self._items[self._order.popleft()]
+
+    def add(self, item):
+        if self.key:
+            item = self.key(item)
+        now = self.clock()
+        if self.max_age is not None:
+            self._expire(now)
+        if item in self._items:
+            return
+        if len(self._order) >= self.maxlen:
+            del self._items[self._order.popleft()]
+        self._items[item] = now
+        self._order.append(item)
+
+    def clear(self):
+        self._items.clear()
+        self._order.clear()
+
+    def memory_usage(self):
+        """Approximate bytes held: the containers plus the stored items and timestamps."""
+        size = sys.getsizeof(self._items) + sys.getsizeof(self._order)
+        # A copy, the stats thread calls this while the fetcher keeps adding
+        for item, added in list(self._items.items()):
+            size += sys.getsizeof(item) + sys.getsizeof(added)
+        return size
+
+    def log_stats(self, name):
+        logger.info(f"{name} seen ids - {len(self)} of {self.maxlen} held, {self.memory_usage() / 2 ** 20:.1f} MiB")
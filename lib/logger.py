@@ -10,6 +10,24 @@ def verbose(self, message, *args, **kws):
 
 logging.Logger.verbose = verbose
 
+
+class LazyLog:
+    """Defers building an expensive log argument until a handler actually formats the record.
+
+    Use it with %-style arguments, never inside an f-string (that would format it straight away):
+        logger.verbose("Message properties: %s", LazyLog(message.get_properties))
+    """
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+    __repr__ = __str__
+
 # Create and configure logger and handler
 logger = logging.getLogger('RFYTGPTBot')
 logger.setLevel(logging.DEBUG)
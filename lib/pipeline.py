@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from lib.logger import logger
+
+
+class PipelineStage:
+    """One worker thread that takes items off its input queue, runs the handler and passes the result on.
+
+    A single worker per stage keeps items in arrival order. The handler returns None to drop an item.
+    With a batch_size the handler is a batching one: it always gets a list of everything waiting (up to
+    batch_size, so a single item list when batch_size is 1) and returns the list of results to pass on.
+    """
+
+    def __init__(self, name, handler, input_queue, stop_event, batch_size=None):
+        self.name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.batch_size = batch_size
+        self.output_queue = None
+        self.stop_event = stop_event
+        self.thread = None
+
+        self.processed = 0
+        self.dropped = 0
+        self.busy_time = 0.0
+        self.start_time = None
+
+    def _put(self, item):
+        # Blocks while the next stage's queue is full (backpressure), checking for a stop in between
+        while not self.stop_event.is_set():
+            try:
+                self.output_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get_batch(self, first_item):
+        items = [first_item]
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.input_queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                item = self.input_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            items = self._get_batch(item) if self.batch_size is not None else [item]
+            start = time.perf_counter()
+            try:
+                if self.batch_size is not None:
+                    results = self.handler(items)
+                else:
+                    results = [self.handler(item)]
+            except Exception as e:
+                logger.error(f"Error in pipeline stage '{self.name}': {e}", exc_info=True)
+                results = [None] * len(items)
+            self.busy_time += time.perf_counter() - start
+            self.processed += len(items)
+
+            passed = [result for result in results if result is not None]
+            self.dropped += len(items) - len(passed)
+            if self.output_queue is not None:
+                for result in passed:
+                    self._put(result)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"pipeline-{self.name}")
+        self.thread.start()
+
+    def get_stats(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "throughput": self.processed / elapsed if elapsed else 0.0,
+            "busy": self.busy_time / elapsed if elapsed else 0.0,
+            "queue_depth": self.input_queue.qsize(),
+        }
+
+
+class Pipeline:
+    """A chain of PipelineStages joined by bounded queues, so every stage works concurrently."""
+
+    def __init__(self, input_queue, stop_event, queue_size=5):
+        self.input_queue = input_queue
+        self.stop_event = stop_event
+        self.queue_size = queue_size
+        self.stages = []
+
+    def add_stage(self, name, handler, batch_size=None):
+        if self.stages:
+            input_queue = queue.Queue(maxsize=self.queue_size)
+            self.stages[-1].output_queue = input_queue
+        else:
+            input_queue = self.input_queue
+        self.stages.append(PipelineStage(name, handler, input_queue, self.stop_event, batch_size=batch_size))
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def join(self):
+        current_thread = threading.current_thread()
+        for stage in self.stages:
+            if stage.thread and stage.thread != current_thread:
+                stage.thread.join()
+
+    def get_stats(self):
+        return {stage.name: stage.get_stats() for stage in self.stages}
+
+    def log_stats(self):
+        parts = []
+        for name, stats in self.get_stats().items():
+            parts.append(f"{name}: {stats['processed']} processed, {stats['dropped']} dropped, "
+                         f"{stats['throughput']:.2f}/s, {stats['busy'] * 100:.0f}% busy, queue {stats['queue_depth']}")
+        logger.info("Pipeline stats - " + " | ".join(parts))
@@ -0,0 +1,79 @@
+import time
+from collections import deque
+from lib.logger import logger
+
+
+class PollScheduler:
+    """Decides how long to wait between polls of a chat API.
+
+    Never polls sooner than the server asked for (pollingIntervalMillis) or min_interval. While chat is active
+    it polls at that floor, every empty poll stretches the interval by idle_factor up to max_idle_interval, and
+    every error doubles it up to max_backoff_interval. One poll with messages snaps it back to the floor.
+
+    Also keeps the end-to-end latency of the messages it's told about (publish time to arrival in the bot).
+    """
+
+    def __init__(self, min_interval=0.0, max_idle_interval=15.0, max_backoff_interval=300.0, idle_factor=1.5,
+                 latency_window=500):
+        self.min_interval = min_interval
+        self.max_idle_interval = max_idle_interval
+        self.max_backoff_interval = max_backoff_interval
+        self.idle_factor = idle_factor
+
+        self.server_interval = 0.0
+        self.interval = min_interval
+        self.errors = 0  # Consecutive errors
+
+        self.polls = 0
+        self.latencies = deque(maxlen=latency_window)  # Seconds, most recent messages only
+        self.max_latency = 0.0
+
+    @property
+    def floor(self):
+        return max(self.min_interval, self.server_interval)
+
+    def record_poll(self, message_count, server_interval=None):
+        """Record a successful poll that returned message_count new messages, server_interval is in seconds."""
+        self.polls += 1
+        self.errors = 0
+        if server_interval is not None:
+            self.server_interval = server_interval
+        if message_count:
+            self.interval = self.floor
+        else:
+            self.interval = min(max(self.interval * self.idle_factor, self.floor), max(self.max_idle_interval, self.floor))
+
+    def record_error(self):
+        """Record a failed poll, e.g. a quota or rate limit error."""
+        self.errors += 1
+        self.interval = min(max(self.floor, 1.0) * 2 ** self.errors, self.max_backoff_interval)
+        logger.warning(f"Poll failed ({self.errors} in a row), backing off to {self.interval:.1f}s")
+
+    def next_interval(self):
+        """Seconds to wait before the next poll."""
+        return self.interval
+
+    def record_latency(self, published_at, now=None):
+        """Record a message published at epoch seconds published_at arriving now."""
+        latency = (time.time() if now is None else now) - published_at
+        self.latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+
+    def get_stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "polls": self.polls,
+            "interval": self.interval,
+            "latency_median": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "latency_max": self.max_latency,
+        }
+
+    def log_stats(self, name):
+        stats = self.get_stats()
+        if stats["latency_median"] is None:
+            latency = "no messages yet"
+        else:
+            latency = (f"latency median {stats['latency_median']:.2f}s, p95 {stats['latency_p95']:.2f}s, "
+                       f"max {stats['latency_max']:.2f}s")
+        logger.info(f"{name} poll stats - {stats['polls']} polls, interval {stats['interval']:.1f}s, {latency}")
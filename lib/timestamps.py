@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+
+
+def timestamp_to_epoch(timestamp):
+    """Convert a logged ISO timestamp to epoch seconds, naive timestamps are taken as UTC."""
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -1,13 +1,190 @@
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 import os
+import json
+import time
+import threading
+from datetime import datetime
+import pytz
 
 from lib.logger import logger
 import pickle
 
+# Data API quota units per call, see https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {
+    "liveBroadcasts.list": 1,
+    "liveChatMessages.list": 5,
+    "liveChatMessages.insert": 50,
+}
+# The daily quota resets at midnight Pacific time
+QUOTA_TIMEZONE = pytz.timezone('America/Los_Angeles')
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+class QuotaBudget:
+    """Tracks Data API quota usage for the day, persisted to state_file so restarts don't forget it.
+
+    reserve units are held back from chat polling for sending messages and broadcast lookups.
+    """
+
+    def __init__(self, daily_limit=10000, state_file="yt_quota_state.json", reserve=500, stream_duration=4 * 3600,
+                 clock=time.time):
+        self.daily_limit = daily_limit
+        self.state_file = state_file
+        self.reserve = reserve
+        self.clock = clock
+        self.stream_end = self.clock() + stream_duration
+        self.lock = threading.Lock()
+        self.date = self._today()
+        self.used = 0
+        self._load()
+
+    def _today(self):
+        return datetime.fromtimestamp(self.clock(), QUOTA_TIMEZONE).date().isoformat()
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Couldn't read quota state from {self.state_file}, starting from 0: {e}")
+            return
+        if state.get('date') == self.date:
+            self.used = state.get('used', 0)
+
+    def _save(self):
+        if not self.state_file:
+            return
+        temp_file = self.state_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({'date': self.date, 'used': self.used}, f)
+        os.replace(temp_file, self.state_file)
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self.date:
+            logger.info(f"YouTube API quota reset for {today}, used {self.used} units on {self.date}")
+            self.date = today
+            self.used = 0
+
+    @property
+    def remaining(self):
+        with self.lock:
+            self._roll_over()
+            return self.daily_limit - self.used
+
+    def spend(self, endpoint):
+        """Charge a call to endpoint, raises QuotaExceededError if it would go over the daily limit."""
+        cost = QUOTA_COSTS[endpoint]
+        with self.lock:
+            self._roll_over()
+            if self.used + cost > self.daily_limit:
+                raise QuotaExceededError(f"{endpoint} needs {cost} units, {self.daily_limit - self.used} left today")
+            self.used += cost
+            self._save()
+
+    def min_poll_interval(self, endpoint="liveChatMessages.list"):
+        """Shortest interval between calls to endpoint that keeps the budget (minus reserve) until the stream ends."""
+        remaining_time = max(self.stream_end - self.clock(), 0)
+        polls = (self.remaining - self.reserve) // QUOTA_COSTS[endpoint]
+        if polls <= 0:
+            return remaining_time
+        return remaining_time / polls
+
+    def log_stats(self):
+        logger.info(f"YouTube API quota - {self.used}/{self.daily_limit} units used on {self.date}, "
+                    f"min poll interval {self.min_poll_interval():.1f}s")
+
+
+class BroadcastCache:
+    """Caches the result of fetch() for ttl seconds.
+
+    Concurrent callers on an empty cache share a single fetch. Once the value is stale, callers get the stale
+    value straight away while one background thread refreshes it.
+    """
+
+    def __init__(self, fetch, ttl=300, clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.value = None
+        self.fetched_at = None
+        self.fetches = 0
+        self._pending = None  # Event set when the in-flight fetch finishes
+        self._error = None
+
+    def _run_fetch(self, done):
+        try:
+            value = self.fetch()
+        except Exception as e:
+            logger.error(f"Broadcast lookup failed: {e}", exc_info=True)
+            with self.lock:
+                self._error = e
+        else:
+            with self.lock:
+                self.value = value
+                self.fetched_at = self.clock()
+                self._error = None
+        finally:
+            with self.lock:
+                self.fetches += 1
+                self._pending = None
+            done.set()
+
+    def get(self):
+        with self.lock:
+            fresh = self.fetched_at is not None and self.clock() - self.fetched_at < self.ttl
+            if fresh:
+                return self.value
+            pending = self._pending
+            if pending is None:
+                pending = self._pending = threading.Event()
+                if self.fetched_at is not None:
+                    # Stale: refresh in the background, serve what we have meanwhile
+                    threading.Thread(target=self._run_fetch, args=(pending,), daemon=True).start()
+                    return self.value
+                fetch_here = True
+            else:
+                if self.fetched_at is not None:
+                    return self.value
+                fetch_here = False
+
+        if fetch_here:
+            self._run_fetch(pending)
+        else:
+            pending.wait()
+        with self.lock:
+            if self.fetched_at is None and self._error is not None:
+                raise self._error
+            return self.value
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = None
+
+
 class YouTubeClient:
-    def __init__(self, config, channel_id=None):
+    def __init__(self, config, channel_id=None, youtube=None, quota=None):
         self.config = config
+        self.quota = quota or QuotaBudget(daily_limit=self.config.youtube_quota_daily_limit,
+                                          state_file=self.config.youtube_quota_state_file,
+                                          reserve=self.config.youtube_quota_reserve,
+                                          stream_duration=self.config.youtube_quota_stream_duration_hours * 3600)
+        self.channel_id = channel_id or self.config.channel_id
+        # One liveBroadcasts.list response answers get_live_id, get_live_chat_id and get_broadcast_status
+        self.broadcast_cache = BroadcastCache(self._fetch_broadcast, ttl=self.config.youtube_broadcast_cache_ttl)
+
+        # An already built client (or a fake one) skips the OAuth flow
+        if youtube is not None:
+            self.youtube = youtube
+            return
+
         # Load the client secrets from the downloaded JSON
         client_secrets_file = "google_secret.json"
 
@@ -36,32 +213,40 @@ class YouTubeClient:
 
         self.youtube = build("youtube", "v3", credentials=creds)
 
-        if channel_id is None:
-            self.channel_id = channel_id
-        else:
-            self.channel_id = self.config.channel_id
+    def _execute(self, endpoint, request):
+        self.quota.spend(endpoint)
+        return request.execute()
 
-    def get_live_chat_id(self):
+    def _fetch_broadcast(self):
         request = self.youtube.liveBroadcasts().list(part="id,snippet,contentDetails,status", broadcastStatus="active")
-        response = request.execute()
+        response = self._execute("liveBroadcasts.list", request)
 
         if len(response['items']) == 0:
             logger.error("No active live streams found.")
             return None
-        if response['items'][0]['status']['lifeCycleStatus'] != 'live':
-            return None
-        return response['items'][0]['snippet']['liveChatId']
+        item = response['items'][0]
+        return {
+            'live_id': item['id'],
+            'live_chat_id': item['snippet'].get('liveChatId'),
+            'status': item['status']['lifeCycleStatus'],
+        }
 
-    def get_live_id(self):
-        request = self.youtube.liveBroadcasts().list(part="id,snippet,contentDetails,status", broadcastStatus="active")
-        response = request.execute()
+    def get_broadcast_status(self):
+        """Lifecycle status of the active broadcast ('live', 'testing', ...), None if there's none."""
+        broadcast = self.broadcast_cache.get()
+        return broadcast['status'] if broadcast else None
 
-        if len(response['items']) == 0:
-            logger.error("No active live streams found.")
+    def get_live_chat_id(self):
+        broadcast = self.broadcast_cache.get()
+        if not broadcast or broadcast['status'] != 'live':
             return None
-        if response['items'][0]['status']['lifeCycleStatus'] != 'live':
+        return broadcast['live_chat_id']
+
+    def get_live_id(self):
+        broadcast = self.broadcast_cache.get()
+        if not broadcast or broadcast['status'] != 'live':
             return None
-        return response['items'][0]['id']
+        return broadcast['live_id']
 
     def get_live_chat_messages(self, live_chat_id, max_results=15, page_token=None):
         request = self.youtube.liveChatMessages().list(
@@ -70,7 +255,7 @@ class YouTubeClient:
             maxResults=max_results,
             pageToken=page_token
         )
-        return request.execute()
+        return self._execute("liveChatMessages.list", request)
 
     def send_chat_message(self, live_chat_id, message):
         r = None
@@ -87,7 +272,7 @@ class YouTubeClient:
                     }
                 }
             )
-            r = request.execute()
+            r = self._execute("liveChatMessages.insert", request)
         except Exception as e:
             logger.error(f'Error sending message: {e}', exc_info=True)
 
@@ -95,7 +280,6 @@ class YouTubeClient:
 
 
 if __name__ == '__main__':
-
-    yt = YouTubeClient(channel_id)
-    live_chat_id = yt.get_live_chat_id()
-    logger.info(live_chat_id)
\ No newline at end of file
+    from config import Config
+    yt = YouTubeClient(Config('config.ini'))
+    logger.info(yt.get_live_chat_id())
@@ -11,8 +11,11 @@ import soundfile as sf
 import prompt_config
 
 from lib.chat_merger import ChatMerger
+from chat_fetchers.registry import create_sources
+from lib.pipeline import Pipeline
+from lib.chat_log import ChatLogWriter
+from lib.chat_replay import ChatReplayer
 from lib.logger import logger
-import json
 from datetime import datetime
 import importlib
 from lib.context_parsing import ContextParser
@@ -23,18 +26,22 @@ from lib.speechtotext import SpeechToText
 prompt_prefix = prompt_config.prompt_prefix
 
 ContextParser.install_spacy_model()
+ContextParser.install_textblob_corpora()
 
 class LiveStreamChatBot:
+    # How long the fetch loop blocks waiting for messages before re-checking the stop flag
+    FETCH_WAIT_TIMEOUT = 1.0
+
     def __init__(self):
+        self.stop_event = threading.Event()
         self.config = Config('config.ini')
         logger.setLevel(self.config.log_level)
-        self.youtube_chat = None
-        self.chat_scraper = None
+        self.youtube_api_client = None
 
 
         logger.info("Starting LiveStreamChatBot")
         if self.config.youtube_api_enabled:
-            self.youtube_api_client = YouTubeClient(self.config.channel_id)
+            self.youtube_api_client = YouTubeClient(self.config)
             self.live_id = self.youtube_api_client.get_live_id()
         else:
             logger.warning("YouTube API not enabled. Using live id from config.ini")
@@ -83,21 +90,18 @@ class LiveStreamChatBot:
                     exit()
 
 
-        if not self.config.chat_fetcher_ytapi_enabled and not self.config.chat_fetcher_ytscraper_enabled:
+        if not self.config.chat_fetcher_sources:
             logger.error("No chat fetchers enabled. Please enable at least one chat fetcher in config.ini.")
             exit()
 
-        if self.config.chat_fetcher_ytapi_enabled:
-            from chat_fetchers.yt_api_chat import YouTubeChat
-            self.youtube_chat = YouTubeChat(self.config, self.youtube_api_client)
-        if self.config.chat_fetcher_ytscraper_enabled:
-            from chat_fetchers.yt_chat_scraper import YoutubeChatScraper
-            self.chat_scraper = YoutubeChatScraper(self.config, self.live_id)
-
-
-        self.chat_merger = ChatMerger(self.config, self.chat_scraper, self.youtube_chat)
+        self.chat_sources = create_sources(self.config, self)
+        record_sources = self.config.chat_logging_enabled and self.config.chat_logging_record_sources
+        self.raw_message_log = queue.Queue() if record_sources else None
+        self.chat_merger = ChatMerger(self.config, self.chat_sources, raw_message_log=self.raw_message_log)
 
         self.replay_file = None
+        self.replay_speed = 1.0  # 0 replays as fast as possible
+        self.replay_start_offset = 0  # Seconds into the recording to start from
         self.manual = False
 
         self.bot = ChatGPT(config=self.config)
@@ -105,6 +109,7 @@ class LiveStreamChatBot:
 
         self.bot.setup(self.config.openai_key, prompt_prefix=prompt_prefix)
         self.message_queue = queue.Queue()
+        self.response_pipeline = self._build_response_pipeline()
 
         self.all_messages_context = []
         self.live_chat_id = None
@@ -131,17 +136,30 @@ class LiveStreamChatBot:
 
         self.refresh_prompt_thread = threading.Thread(target=self.refresh_prompt)
         self.message_log = queue.Queue()
+        self.chat_log_writer = None
+        self.source_log_writers = {}  # Source name -> ChatLogWriter, with record_sources
         self.disable_chat_save = False
         self.speech_to_text = False
         self.setup()
 
+    @property
+    def stop_running(self):
+        return self.stop_event.is_set()
+
+    @stop_running.setter
+    def stop_running(self, value):
+        if value:
+            self.stop_event.set()
+        else:
+            self.stop_event.clear()
+
     def setup(self):
         if not os.path.exists(self.config.chat_logging_directory):
             os.makedirs(self.config.chat_logging_directory)
         cleanup_folder(self.config.chat_logging_directory, 10)
         # Generate the filename based on the current date and time
         current_datetime_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-        self.output_file_path = f"{self.config.chat_logging_directory}/{current_datetime_str}.json"
+        self.output_file_path = f"{self.config.chat_logging_directory}/{current_datetime_str}.jsonl"
 
     def refresh_prompt(self):
         while not self.stop_running:
@@ -164,9 +182,8 @@ class LiveStreamChatBot:
             input_manager = InputManager(self.manual_message_callback, self.stop_running)
             try:
                 input_manager.start()
-                while not self.stop_running:
-                    # Here we're simply waiting for the stop signal
-                    pass
+                # Here we're simply waiting for the stop signal
+                self.stop_event.wait()
             except UnicodeDecodeError:
                 logger.verbose("Caught UnicodeDecodeError. Skipping message")
             except SystemExit:
@@ -183,50 +200,29 @@ class LiveStreamChatBot:
         if self.replay_file:
             self.disable_chat_save = True # Disable chat saving if we're replaying a file
             logger.debug(f"Replay file specified, loading {self.replay_file}")
-            if os.path.exists(self.replay_file):
-                with open(self.replay_file, 'r') as f:
-                    chat_log = json.load(f)
-            else:
+            if not os.path.exists(self.replay_file):
                 logger.error(f"Replay file {self.replay_file} does not exist.")
                 self.stop_running = True
                 raise ValueError(f"Replay file {self.replay_file} does not exist.")
 
-
-            prev_timestamp = None
-            for entry in chat_log:
-                if self.stop_running:
-                    break
-                if prev_timestamp:
-                    # Calculate delay based on the difference in timestamps
-                    time_diff = datetime.fromisoformat(entry['timestamp'].rstrip('Z')) - datetime.fromisoformat(prev_timestamp.rstrip('Z'))
-
-                    delay = time_diff.total_seconds()
-                    logger.debug(f"Delaying for {delay} seconds to simulate real time.")
-                    for _ in range(int(delay)):
-                        if self.stop_running:
-                            return
-                        time.sleep(1)
-                self.message_queue.put({
-                    "author": entry['author'],
-                    "timestamp": entry['timestamp'],
-                    "message": entry['message']
-                })
-
-                prev_timestamp = entry['timestamp']
+            replayer = ChatReplayer(self.replay_file, speed=self.replay_speed, start_offset=self.replay_start_offset,
+                                    stop_event=self.stop_event)
+            replayer.replay(self.message_queue)
             return
 
 
         while not self.stop_running:
 
-            messages = self.chat_merger.get_unique_messages()
+            # Sleeps until a fetcher signals new messages, the timeout only bounds how long a stop can go unnoticed
+            messages = self.chat_merger.wait_for_messages(timeout=self.FETCH_WAIT_TIMEOUT)
 
             if self.first_run:
                 self.all_messages_context = messages
                 self.first_run = False
-                self.chat_merger.seen_messages_hashes.clear()
+                self.chat_merger.reset()
             else:
                 for message in messages:
-                    logger.debug(f"Recieved Message: {message}")
+                    logger.debug("Recieved Message: %s", message)
                     self.message_queue.put(message)
 
     def save_messages_to_file(self):
@@ -234,89 +230,129 @@ class LiveStreamChatBot:
         if self.disable_chat_save:
             logger.warning("Chat saving disabled (likely due to chat replay).")
             return
-        try:
-            with open(self.output_file_path, 'r') as f:
-                messages = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            messages = []
+        self.save_source_messages_to_file()
+        if self.message_log.empty():
+            return
+
+        if self.chat_log_writer is None:
+            self.chat_log_writer = ChatLogWriter(self.output_file_path, fsync_policy=self.config.chat_logging_fsync_policy)
 
         counter = 0
-        # Add messages from the queue
+        # Append messages from the queue, only the new entries are ever written
         while not self.message_log.empty():
-            messages.append(self.message_log.get())
+            self.chat_log_writer.write(self.message_log.get())
             counter += 1
 
-        if counter > 0:
-            logger.info(f"Saving {counter} messages to file.")
-            # Write back to the file
+        logger.info(f"Saving {counter} messages to file.")
+        self.chat_log_writer.flush()
+
+    def save_source_messages_to_file(self):
+        """Save the messages each source delivered to that source's own file, next to the chat log."""
+        if self.raw_message_log is None or self.raw_message_log.empty():
+            return
+
+        counter = 0
+        while not self.raw_message_log.empty():
+            source_name, message = self.raw_message_log.get()
+            writer = self.source_log_writers.get(source_name)
+            if writer is None:
+                path = f"{os.path.splitext(self.output_file_path)[0]}.{source_name}.jsonl"
+                writer = self.source_log_writers[source_name] = ChatLogWriter(
+                    path, fsync_policy=self.config.chat_logging_fsync_policy)
+            writer.write(message)
+            counter += 1
 
-            with open(self.output_file_path, 'w') as f:
-                json.dump(messages, f, indent=4, default=str)
+        logger.info(f"Saving {counter} source messages to file.")
+        for writer in self.source_log_writers.values():
+            writer.flush()
 
     def batched_file_writer(self, interval=30):
         """Repeatedly save messages to the file in batches every `interval` seconds."""
         while not self.stop_running:
             for _ in range(interval):
                 if self.stop_running:
-                    return
+                    break
                 time.sleep(1)
             try:
                 self.save_messages_to_file()
             except Exception as e:
                 logger.error(f"Error while saving messages to file: {e}", exc_info=True)
 
+        if self.chat_log_writer:
+            self.chat_log_writer.close()
+        for writer in self.source_log_writers.values():
+            writer.close()
 
-    def process_messages(self):
-        while not self.message_queue.empty() and not self.stop_running:
 
-            raw_output = self.message_queue.get()
-            logger.verbose(f"Processing message: {raw_output}")
+    def _build_response_pipeline(self):
+        """Relevance -> LLM -> TTS -> playback, each on its own thread so response N+1 is synthesized while N plays."""
+        pipeline = Pipeline(self.message_queue, self.stop_event, queue_size=self.config.pipeline_queue_size)
+        # Bursts of chat are drained and classified together, see ContextParser.classify_batch
+        pipeline.add_stage("relevance", self.check_relevance, batch_size=self.config.context_parser_batch_size)
+        pipeline.add_stage("response", self.generate_response)
+        if self.config.tts_enabled:
+            pipeline.add_stage("tts", self.synthesize_response)
+            pipeline.add_stage("playback", self.play_response)
+        return pipeline
 
-            author = raw_output['author']
-            timestamp = raw_output['timestamp']
-            message = raw_output['message']
+    def check_relevance(self, raw_outputs):
+        for raw_output in raw_outputs:
+            logger.verbose("Processing message: %s", raw_output)
 
-            if message == "":  # Ignore empty messages
-                continue
+        # Ignore empty messages
+        messages = [raw_output for raw_output in raw_outputs if raw_output['message'] != ""]
 
-            relevant = True
-            try:
-                relevant = self.context_parser.is_relevant(raw_output)
-                logger.verbose(f"Message relevant: {relevant}")
-                if not relevant:
-                    continue
-            except Exception as e:
-                logger.error(f"Error while checking relevance of message: {e}", exc_info=True)
+        # Errors are handled per message, a message that fails its check is let through on its own
+        relevant = self.context_parser.classify_batch(messages)
+        logger.verbose("Messages relevant: %s", relevant)
 
-            formatted_message = f"From: {author}, {message}"
-            response = "Oops! I've momentarily slipped into another dimension. Let's realign our cosmic frequencies and try that again."
-            try:
-                response = self.bot.get_response_text(author, formatted_message, self.all_messages_context)
-            except Exception as e:
-                logger.error(f"Error while getting response from OpenAI: {e}", exc_info=True)
-
-            self.message_log.put({"author": author, "timestamp": timestamp, "message": message, "response": response, "relevant": relevant})
-            logger.info({"author": author, "timestamp": timestamp, "message": message, "response": response})
-            logger.debug(f"Received Response from OpenAI: {response}")
-
-            self.all_messages_context.append(raw_output)
-            self.all_messages_context.append({"role": "system", "content": f"{response}"})
-            self.all_messages_context = self.all_messages_context[self.config.message_history:]
-
-            if self.config.tts_enabled:
-                # Generate TTS audio from the response and give it to a file
-                start_time = time.time()
-                try:
-                    tts_audio_path = self.generate_tts_audio(response)
-                except Exception as e:
-                    logger.error(f"Error while generating TTS audio: {e}", exc_info=True)
-                    continue
-                end_time = time.time()  # Add timestamp at the end
-                step_time = end_time - start_time
-                logger.verbose(f"Time taken for generating TTS audio: {step_time} seconds")
-                logger.debug("Playing TTS Audio")
-                self.play_audio_file(tts_audio_path)
-                os.remove(tts_audio_path)
+        return [{"raw_output": raw_output, "relevant": is_relevant}
+                for raw_output, is_relevant in zip(messages, relevant) if is_relevant]
+
+    def generate_response(self, item):
+        raw_output = item['raw_output']
+        author = raw_output['author']
+        timestamp = raw_output['timestamp']
+        message = raw_output['message']
+
+        formatted_message = f"From: {author}, {message}"
+        response = "Oops! I've momentarily slipped into another dimension. Let's realign our cosmic frequencies and try that again."
+        try:
+            response = self.bot.get_response_text(author, formatted_message, self.all_messages_context)
+        except Exception as e:
+            logger.error(f"Error while getting response from OpenAI: {e}", exc_info=True)
+
+        self.message_log.put({"author": author, "timestamp": timestamp, "message": message, "response": response, "relevant": item['relevant']})
+        logger.info({"author": author, "timestamp": timestamp, "message": message, "response": response})
+        logger.debug(f"Received Response from OpenAI: {response}")
+
+        self.all_messages_context.append(raw_output)
+        self.all_messages_context.append({"role": "system", "content": f"{response}"})
+        self.all_messages_context = self.all_messages_context[self.config.message_history:]
+
+        item['response'] = response
+        return item
+
+    def synthesize_response(self, item):
+        # Generate TTS audio from the response and load it, so the file can be reused for the next response
+        start_time = time.time()
+        try:
+            tts_audio_path = self.generate_tts_audio(item['response'])
+        except Exception as e:
+            logger.error(f"Error while generating TTS audio: {e}", exc_info=True)
+            return None
+        item['audio'] = sf.read(tts_audio_path, dtype='float32')
+        os.remove(tts_audio_path)
+        end_time = time.time()  # Add timestamp at the end
+        step_time = end_time - start_time
+        logger.verbose(f"Time taken for generating TTS audio: {step_time} seconds")
+        return item
+
+    def play_response(self, item):
+        logger.debug("Playing TTS Audio")
+        data, fs = item['audio']
+        self.play_audio_data(data, fs)
+        return item
 
     def generate_tts_audio(self, text):
         logger.debug("Generating TTS")
@@ -374,7 +410,9 @@ class LiveStreamChatBot:
     def play_audio_file(self, file_path):
         # Read file to numpy array
         data, fs = sf.read(file_path, dtype='float32')
+        self.play_audio_data(data, fs)
 
+    def play_audio_data(self, data, fs):
         # Set default sample rate
         sd.default.samplerate = fs
         try:
@@ -399,11 +437,9 @@ class LiveStreamChatBot:
             bot.speech_to_text = speech_to_text
 
         if not self.manual and not self.replay_file:
-            logger.info("Not manual and not chat replay, starting chat scraper and youtube chat.")
-            if self.youtube_chat:
-                self.youtube_chat.start_threaded()
-            if self.chat_scraper:
-               self.chat_scraper.start_threaded()
+            logger.info("Not manual and not chat replay, starting chat sources.")
+            for source in self.chat_sources:
+                source.start_threaded()
             logger.info(f"Letting chat gather for {self.config.chat_fetcher_startup_delay} seconds")
             for _ in range(self.config.chat_fetcher_startup_delay):
                 if self.stop_running:
@@ -416,11 +452,18 @@ class LiveStreamChatBot:
         if self.config.chat_logging_enabled:
             self.file_writer_thread.start()
         self.refresh_prompt_thread.start()
+        self.response_pipeline.start()
         logger.info("Hopii is running.")
         try:
             while not self.stop_running:
-                self.process_messages()
-                time.sleep(1)  # Wait 1 seconds between responding to messages
+                for _ in range(self.config.pipeline_stats_interval):
+                    if self.stop_running:
+                        break
+                    time.sleep(1)
+                self.response_pipeline.log_stats()
+                self.chat_merger.log_stats()
+                for source in self.chat_sources:
+                    source.log_stats()
         except KeyboardInterrupt:  # Graceful shutdown
             self.shutdown()
 
@@ -430,12 +473,10 @@ class LiveStreamChatBot:
             self.youtube_api_client.send_chat_message(self.live_chat_id, "Get some rest Hopii, you look tired.")
         time.sleep(1)
         self.stop_running = True
-        if self.chat_scraper:
-            logger.verbose("Stopping chat scraper.")
-            self.chat_scraper.stop()
-        if self.youtube_chat:
-            logger.verbose("Stopping youtube chat.")
-            self.youtube_chat.stop()
+        self.chat_merger.wake()
+        for source in self.chat_sources:
+            logger.verbose(f"Stopping chat source {source.source_name}.")
+            source.stop()
         current_thread = threading.current_thread()
 
 
@@ -452,6 +493,9 @@ class LiveStreamChatBot:
             logger.verbose("Waiting for refresh prompt thread to join.")
             self.refresh_prompt_thread.join()
 
+        logger.verbose("Waiting for response pipeline to join.")
+        self.response_pipeline.join()
+
         if self.speech_to_text:
             self.speech_to_text.stop_event.set()
             logger.verbose("Stopping speech to text.")
@@ -465,6 +509,7 @@ os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'googleapi.json'
 if __name__ == '__main__':
     bot = LiveStreamChatBot()
     # bot.manual = True
-    # bot.replay_file = "chat_logs/20230918_143330.json"
+    # bot.replay_file = "chat_logs/20230918_143330.jsonl"
+    # bot.replay_speed = 10
 
     bot.run()
@@ -0,0 +1,46 @@
+# Records a live_chat page and a few get_live_chat responses from a live stream, for refreshing these fixtures
+# when YouTube changes the payloads. Trim the output by hand (a handful of actions of each kind, no avatars
+# beyond the first size) and redact the API key and visitorData before committing.
+# Run from the repo root: python tests/fixtures/innertube/record.py <live_id> [--polls 3]
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+from chat_fetchers.yt_innertube_chat import YoutubeInnertubeChat, parse_continuation, parse_live_chat_page  # noqa: E402
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Record innertube live chat fixtures")
+    arg_parser.add_argument("live_id")
+    arg_parser.add_argument("--polls", type=int, default=3)
+    arg_parser.add_argument("--output", default=os.path.dirname(os.path.abspath(__file__)))
+    args = arg_parser.parse_args()
+
+    session = YoutubeInnertubeChat._create_session()
+    base_url = "https://www.youtube.com"
+    page = session.get(f"{base_url}/live_chat?is_popout=1&v={args.live_id}", timeout=10)
+    page.raise_for_status()
+    with open(os.path.join(args.output, "live_chat_page.html"), 'w', encoding='utf-8') as f:
+        f.write(page.text)
+
+    api_key, context, chat_data = parse_live_chat_page(page.text)
+    continuation, timeout = parse_continuation(chat_data)
+    for poll in range(1, args.polls + 1):
+        time.sleep(timeout)
+        response = session.post(f"{base_url}/youtubei/v1/live_chat/get_live_chat",
+                                params={"key": api_key, "prettyPrint": "false"},
+                                json={"context": context, "continuation": continuation}, timeout=10)
+        response.raise_for_status()
+        body = response.json()
+        with open(os.path.join(args.output, f"get_live_chat_{poll}.json"), 'w', encoding='utf-8') as f:
+            json.dump(body, f, indent=1, ensure_ascii=False)
+            f.write("\n")
+        continuation, timeout = parse_continuation(body['continuationContents']['liveChatContinuation'])
+        print(f"Recorded poll {poll}, next continuation in {timeout}s")
+
+
+if __name__ == '__main__':
+    main()
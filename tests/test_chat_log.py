@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from lib.chat_log import ChatLogWriter, convert_chat_log, read_chat_log
+
+ENTRIES = [
+    {"author": "viewer", "timestamp": "2023-09-18T14:33:30Z", "message": "hopii hi", "response": "Hi!", "relevant": True},
+    {"author": "@stargazer", "timestamp": "2023-09-18T14:33:41Z", "message": "ünïcödé 🚀\nsecond line", "relevant": False},
+]
+
+
+@pytest.mark.parametrize("fsync_policy", ["never", "flush", "always"])
+def test_round_trip(tmp_path, fsync_policy):
+    path = tmp_path / "chat.jsonl"
+    writer = ChatLogWriter(str(path), fsync_policy=fsync_policy)
+    for entry in ENTRIES:
+        writer.write(entry)
+    writer.close()
+
+    assert list(read_chat_log(str(path))) == ENTRIES
+    assert len(path.read_text(encoding="utf-8").splitlines()) == len(ENTRIES)
+
+
+def test_reopened_log_is_appended_to(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    for entry in ENTRIES:
+        writer = ChatLogWriter(path)
+        writer.write(entry)
+        writer.close()
+    assert list(read_chat_log(path)) == ENTRIES
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    lines = [json.dumps(entry) for entry in ENTRIES]
+    path.write_text(lines[0] + "\n" + lines[1][:20], encoding="utf-8")
+    assert list(read_chat_log(str(path))) == ENTRIES[:1]
+
+
+def test_legacy_log_read_and_converted(tmp_path):
+    legacy = tmp_path / "chat.json"
+    legacy.write_text("\n  " + json.dumps(ENTRIES, indent=4), encoding="utf-8")
+    assert list(read_chat_log(str(legacy))) == ENTRIES
+
+    converted = str(tmp_path / "chat.jsonl")
+    assert convert_chat_log(str(legacy), converted) == len(ENTRIES)
+    assert list(read_chat_log(converted)) == ENTRIES
+
+
+def test_invalid_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        ChatLogWriter(str(tmp_path / "chat.jsonl"), fsync_policy="sometimes")
@@ -0,0 +1,119 @@
+import queue
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from chat_fetchers.base import ChatSource
+from lib.chat_merger import ChatMerger
+
+
+class FakeSource(ChatSource):
+    def __init__(self, config, source_name):
+        super().__init__(config)
+        self.source_name = source_name
+
+
+def make_config(**overrides):
+    config = SimpleNamespace(chat_fetcher_queue_size=100, chatmerger_message_history=1000,
+                             chatmerger_match_window=120, chatmerger_reorder_delay=1.0)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def chat(text, sent_at, author="viewer", **fields):
+    return {"author": author, "timestamp": iso(sent_at), "message": text, **fields}
+
+
+def test_held_messages_released_in_timestamp_order():
+    config = make_config()
+    scraper, api = FakeSource(config, "scraper"), FakeSource(config, "api")
+    merger = ChatMerger(config, [scraper, api])
+    now = time.time()
+
+    # Each source's messages arrive in their own drain, out of order with each other
+    scraper.put_message(chat("second", now - 0.2))
+    assert merger.get_unique_messages() == []
+    api.put_message(chat("first", now - 0.4))
+    assert merger.get_unique_messages() == []
+
+    time.sleep(1.0)
+    assert [message['message'] for message in merger.get_unique_messages()] == ["first", "second"]
+
+
+def test_late_messages_are_not_held():
+    config = make_config()
+    source = FakeSource(config, "api")
+    merger = ChatMerger(config, [source])
+    source.put_message(chat("hello", time.time() - 10))
+    assert [message['message'] for message in merger.get_unique_messages()] == ["hello"]
+
+
+def test_reset_drops_held_messages():
+    config = make_config()
+    source = FakeSource(config, "scraper")
+    merger = ChatMerger(config, [source])
+    source.put_message(chat("backlog", time.time()))
+    assert merger.get_unique_messages() == []
+
+    merger.reset()
+    assert merger.pending == []
+    time.sleep(1.0)
+    assert merger.get_unique_messages() == []
+
+
+def test_copies_from_other_sources_are_counted_not_emitted():
+    config = make_config(chatmerger_reorder_delay=0)
+    scraper, api = FakeSource(config, "scraper"), FakeSource(config, "api")
+    merger = ChatMerger(config, [scraper, api])
+    now = time.time()
+
+    scraper.put_message(chat("hopii hi", now, author="Viewer"))
+    [emitted] = merger.get_unique_messages()
+    # The API's copy has the handle's @, other whitespace and its own id
+    api.put_message(chat("hopii  hi", now + 0.5, author="@viewer", id="LCC.1"))
+    api.put_message(chat("hopii  hi", now + 0.5, author="@viewer", id="LCC.1"))
+    assert merger.get_unique_messages() == []
+
+    assert emitted == chat("hopii hi", now, author="Viewer", source="scraper")
+    assert merger.matched_sources == {"api": 1}
+    assert merger.stats == {"received": 3, "emitted": 1, "merged": 1, "duplicates": 1}
+
+
+def test_raw_message_log_gets_every_source_message_as_delivered():
+    config = make_config(chatmerger_reorder_delay=0)
+    scraper, api = FakeSource(config, "scraper"), FakeSource(config, "api")
+    raw_message_log = queue.Queue()
+    merger = ChatMerger(config, [scraper, api], raw_message_log=raw_message_log)
+    now = time.time()
+
+    scraper.put_message(chat("hopii hi", now))
+    api.put_message(chat("hopii hi", now, id="LCC.1"))
+    merger.get_unique_messages()
+
+    assert list(raw_message_log.queue) == [("scraper", chat("hopii hi", now)),
+                                           ("api", chat("hopii hi", now, id="LCC.1"))]
+
+
+def test_dedup_by_id_outlives_the_match_window():
+    config = make_config(chatmerger_match_window=10)
+    merger = ChatMerger(config, [])
+
+    assert merger.merge(chat("gg", 0, id="LCC.1"), "api", now=0, timestamp=0)
+    merger._expire(100)
+    # The id is still remembered, the same text without an id is a new message
+    assert merger.merge(chat("gg", 100, id="LCC.1"), "api", now=100, timestamp=100) is None
+    assert merger.merge(chat("gg", 100), "scraper", now=100, timestamp=100)
+    assert merger.stats["duplicates"] == 1
+
+
+def test_same_text_outside_the_match_window_is_a_new_message():
+    merger = ChatMerger(make_config(chatmerger_match_window=10), [])
+    assert merger.merge(chat("gg", 0), "scraper", now=0, timestamp=0)
+    assert merger.merge(chat("gg", 5), "api", now=5, timestamp=5) is None
+    assert merger.merge(chat("gg", 30), "api", now=6, timestamp=30)
+    assert merger.stats["emitted"] == 2
@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from lib.chat_log import ChatLogWriter
+from lib.chat_replay import ChatReplayer
+
+START = datetime(2023, 9, 18, 14, 33, 30, tzinfo=timezone.utc)
+
+
+def write_log(path, offsets, legacy=False):
+    """A chat log with one message at each of offsets seconds into the recording."""
+    entries = [{"author": f"viewer{i}", "message": f"message {i}", "response": "",
+                "timestamp": (START + timedelta(seconds=offset)).isoformat().replace('+00:00', 'Z')}
+               for i, offset in enumerate(offsets)]
+    if legacy:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+    else:
+        writer = ChatLogWriter(path)
+        for entry in entries:
+            writer.write(entry)
+        writer.close()
+    return str(path)
+
+
+class TimingQueue:
+    """Records when each message was put, relative to the first."""
+
+    def __init__(self):
+        self.messages = []
+        self.times = []
+
+    def put(self, message):
+        self.messages.append(message)
+        self.times.append(time.perf_counter())
+
+    def offsets(self):
+        return [put_time - self.times[0] for put_time in self.times]
+
+
+@pytest.mark.parametrize("legacy", [False, True])
+def test_gaps_scaled_by_speed(tmp_path, legacy):
+    path = write_log(tmp_path / "chat.log", [0, 1, 1, 3], legacy=legacy)
+    message_queue = TimingQueue()
+    assert ChatReplayer(path, speed=10).replay(message_queue) == 4
+
+    assert [message['author'] for message in message_queue.messages] == ["viewer0", "viewer1", "viewer2", "viewer3"]
+    assert set(message_queue.messages[0]) == {"author", "timestamp", "message"}
+    assert message_queue.offsets() == pytest.approx([0, 0.1, 0.1, 0.3], abs=0.05)
+
+
+def test_speed_zero_replays_without_waiting(tmp_path):
+    path = write_log(tmp_path / "chat.jsonl", [0, 60, 120])
+    message_queue = TimingQueue()
+    start = time.perf_counter()
+    assert ChatReplayer(path, speed=0).replay(message_queue) == 3
+    assert time.perf_counter() - start < 0.5
+
+
+def test_start_offset_skips_into_the_recording(tmp_path):
+    path = write_log(tmp_path / "chat.jsonl", range(50))
+    replayer = ChatReplayer(path, speed=10, start_offset=40)
+    replayer.INDEX_STRIDE = 7
+    message_queue = TimingQueue()
+    assert replayer.replay(message_queue) == 10
+
+    assert message_queue.messages[0]['author'] == "viewer40"
+    # Timing starts from the first replayed entry, not from the start of the recording
+    assert message_queue.offsets()[-1] == pytest.approx(0.9, abs=0.05)
+
+
+def test_stop_event_ends_the_replay(tmp_path):
+    path = write_log(tmp_path / "chat.jsonl", [0, 0, 60])
+    stop_event = threading.Event()
+    threading.Timer(0.2, stop_event.set).start()
+    message_queue = TimingQueue()
+    start = time.perf_counter()
+    assert ChatReplayer(path, speed=1, stop_event=stop_event).replay(message_queue) == 2
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,67 @@
+from lib.dedup import BoundedSet, compact_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_oldest_forgotten_past_maxlen():
+    seen = BoundedSet(3)
+    for item in "abcd":
+        seen.add(item)
+    assert len(seen) == 3
+    assert "a" not in seen
+    assert all(item in seen for item in "bcd")
+
+
+def test_readding_keeps_the_original_position():
+    seen = BoundedSet(2)
+    seen.add("a")
+    seen.add("b")
+    seen.add("a")
+    seen.add("c")
+    assert "a" not in seen
+    assert "b" in seen and "c" in seen
+
+
+def test_items_expire_after_max_age():
+    clock = FakeClock()
+    seen = BoundedSet(100, max_age=60, clock=clock)
+    seen.add("a")
+    clock.now = 30
+    seen.add("b")
+
+    clock.now = 60
+    assert "a" in seen
+    clock.now = 61
+    # Expired items aren't matched, and the next add drops them
+    assert "a" not in seen
+    assert "b" in seen
+    seen.add("c")
+    assert len(seen) == 2
+
+    clock.now = 200
+    seen.add("d")
+    assert len(seen) == 1
+    assert "b" not in seen and "c" not in seen
+
+
+def test_key_applied_to_adds_and_lookups():
+    message_id = "LCC.CjgKDQoLbWhKUnpRc3pHEicKGENNM3M5SXk2MGY0Q0ZRa0Q1UWdkdVlnTGlR"
+    seen = BoundedSet(10, key=compact_id)
+    seen.add(message_id)
+    assert message_id in seen
+    assert "LCC.other" not in seen
+    assert isinstance(next(iter(seen._items)), int)
+
+
+def test_clear():
+    seen = BoundedSet(10)
+    seen.add("a")
+    seen.clear()
+    assert len(seen) == 0
+    assert "a" not in seen
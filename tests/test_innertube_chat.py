@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from chat_fetchers.yt_innertube_chat import (YoutubeInnertubeChat, parse_chat_actions, parse_continuation,
+                                             parse_live_chat_page)
+
+# Trimmed and redacted live_chat responses, tests/fixtures/innertube/record.py records fresh ones
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "innertube")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def continuation_fixture(name):
+    return json.loads(read_fixture(name))['continuationContents']['liveChatContinuation']
+
+
+def make_config(**overrides):
+    config = SimpleNamespace(bot_display_name="Hopii", chat_fetcher_queue_size=100, chat_fetcher_seen_ids_size=1000,
+                             chat_fetcher_seen_ids_max_age=3600, chat_fetcher_ytinnertube_max_idle_interval=5,
+                             chat_fetcher_ytinnertube_max_backoff_interval=60)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def test_parse_live_chat_page():
+    api_key, context, chat_data = parse_live_chat_page(read_fixture("live_chat_page.html"))
+    assert api_key == "AIzaSy-redacted-fixture-key"
+    assert context['client']['clientName'] == "WEB"
+    assert parse_continuation(chat_data) == ("0ofMyANhGlhDaWtxSndvWVZVTnpXamxET0ZJMFJrOWxiRXc1", 10.0)
+
+
+def test_parse_live_chat_page_not_live():
+    with pytest.raises(ValueError):
+        parse_live_chat_page("<html><body>This live stream recording is not available.</body></html>")
+
+
+def test_parse_continuation():
+    assert parse_continuation(continuation_fixture("get_live_chat_1.json")) == (
+        "0ofMyANhGlhDaWtxSndvWVZVTnpXamxET0ZJMFJrOWxiRXcy", 10.0)
+    # Quiet chat: a timed continuation and no actions at all
+    assert parse_continuation(continuation_fixture("get_live_chat_2.json")) == (
+        "0ofMyANhGlhDaWtxSndvWVZVTnpXamxET0ZJMFJrOWxiRXcz", 5.329)
+    assert parse_continuation({}) == (None, None)
+
+
+def test_parse_chat_actions_page_backlog():
+    _, _, chat_data = parse_live_chat_page(read_fixture("live_chat_page.html"))
+    # The welcome banner, the Super Chat and its ticker item are skipped
+    assert parse_chat_actions(chat_data['actions']) == [
+        {'id': "ChwKGkNNM3M5SXk2MGY0Q0ZRa0Q1UWdkdVlnTGlR", 'author': "@stargazer",
+         'timestamp': "2023-10-18T11:59:52.250000Z", 'message': "hi hopii :yt: \N{WAVING HAND SIGN}"},
+        {'id': "ChwKGkNPN0Q5SXk2MGY0Q0ZZa0I1UWdkZUhVQ1ZB", 'author': "@rocketfan",
+         'timestamp': "2023-10-18T11:59:58.004000Z", 'message': "hopii what engine does the booster use?"},
+    ]
+
+
+def test_parse_chat_actions_custom_emoji_and_non_text():
+    messages = parse_chat_actions(continuation_fixture("get_live_chat_1.json")['actions'])
+    # The membership item and the deletion are skipped, links keep their text
+    assert [message['message'] for message in messages] == [
+        "hopii what engine does the booster use?",
+        "check this out https://www.spacex.com/launches/",
+        "Thanks for the support! :_hopiiWave:",
+        ":_hopiiWave: :_hopiiWave:",
+    ]
+    assert messages[2]['timestamp'] == "2023-10-18T12:00:07Z"
+
+
+class FixtureYouTube(BaseHTTPRequestHandler):
+    """Serves the live_chat page on GET and the next queued get_live_chat response on POST."""
+    responses = []
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, content_type, body):
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply("text/html; charset=utf-8", read_fixture("live_chat_page.html"))
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FixtureYouTube.requests.append((parse_qs(urlparse(self.path).query), body))
+        self._reply("application/json", FixtureYouTube.responses.pop(0))
+
+
+@pytest.fixture
+def stub_server():
+    FixtureYouTube.responses = []
+    FixtureYouTube.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureYouTube)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def drain(chat):
+    messages = []
+    while not chat.message_queue.empty():
+        messages.append(chat.message_queue.get_nowait())
+    return messages
+
+
+def test_fetcher_against_stub_server(stub_server):
+    FixtureYouTube.responses = [read_fixture(name) for name in
+                                ("get_live_chat_1.json", "get_live_chat_2.json", "get_live_chat_ended.json")]
+    chat = YoutubeInnertubeChat(make_config(), "mhJRzQsLZGg", base_url=stub_server)
+    try:
+        chat.load_page()
+        assert [message['author'] for message in drain(chat)] == ["@stargazer", "@rocketfan"]
+
+        # The repeated backlog message and the bot's own message are dropped
+        assert chat.fetch_messages() == 2
+        assert [message['message'] for message in drain(chat)] == [
+            "check this out https://www.spacex.com/launches/", ":_hopiiWave: :_hopiiWave:"]
+        query, body = FixtureYouTube.requests[0]
+        assert query['key'] == ["AIzaSy-redacted-fixture-key"]
+        assert body['continuation'] == "0ofMyANhGlhDaWtxSndvWVZVTnpXamxET0ZJMFJrOWxiRXc1"
+        assert body['context']['client']['clientName'] == "WEB"
+
+        assert chat.fetch_messages() == 0
+        assert chat.continuation == "0ofMyANhGlhDaWtxSndvWVZVTnpXamxET0ZJMFJrOWxiRXcz"
+        assert FixtureYouTube.requests[1][1]['continuation'] == "0ofMyANhGlhDaWtxSndvWVZVTnpXamxET0ZJMFJrOWxiRXcy"
+
+        with pytest.raises(ValueError):
+            chat.fetch_messages()
+    finally:
+        chat.session.close()
+
+
+def test_unexpected_payload_counts_towards_max_errors(stub_server):
+    # An action list that isn't a list of dicts fails with AttributeError, not one of the expected errors
+    malformed = json.dumps({'continuationContents': {'liveChatContinuation': {'actions': ["not an action"]}}})
+    FixtureYouTube.responses = [malformed] * 5
+    chat = YoutubeInnertubeChat(make_config(), "mhJRzQsLZGg", base_url=stub_server)
+    chat.poll_scheduler.next_interval = lambda: 0
+    try:
+        chat.run_chat()
+    finally:
+        chat.session.close()
+    assert chat.error_count == chat.MAX_ERRORS
+    assert chat.stop_event.is_set()
@@ -0,0 +1,80 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from lib.pipeline import Pipeline
+
+
+def run_pipeline(pipeline, input_queue, items, expected):
+    """Feeds items into a started pipeline and collects what its last stage passes on."""
+    output_queue = queue.Queue()
+    pipeline.stages[-1].output_queue = output_queue
+    pipeline.start()
+    try:
+        for item in items:
+            input_queue.put(item)
+        return [output_queue.get(timeout=5) for _ in range(expected)]
+    finally:
+        pipeline.stop_event.set()
+        pipeline.join()
+
+
+def check_relevance(raw_outputs):
+    """Shaped like LiveStreamChatBot.check_relevance: a list of messages in, the relevant ones out."""
+    assert isinstance(raw_outputs, list)
+    return [{"raw_output": raw_output, "relevant": True}
+            for raw_output in raw_outputs if raw_output['message'].startswith("hopii")]
+
+
+@pytest.mark.parametrize("batch_size", [1, 64])
+def test_batching_stage_gets_lists(batch_size):
+    input_queue = queue.Queue()
+    pipeline = Pipeline(input_queue, threading.Event())
+    pipeline.add_stage("relevance", check_relevance, batch_size=batch_size)
+    pipeline.add_stage("response", lambda item: item['raw_output']['message'].upper())
+
+    messages = [{"author": "viewer", "message": text} for text in ("hopii hi", "lol", "hopii how are you", "gg")]
+    assert run_pipeline(pipeline, input_queue, messages, 2) == ["HOPII HI", "HOPII HOW ARE YOU"]
+
+    relevance = pipeline.get_stats()["relevance"]
+    assert relevance["processed"] == 4
+    assert relevance["dropped"] == 2
+
+
+def test_item_stage_gets_items():
+    input_queue = queue.Queue()
+    pipeline = Pipeline(input_queue, threading.Event())
+    pipeline.add_stage("double", lambda item: item * 2)
+    pipeline.add_stage("odd", lambda item: item if item % 4 else None)
+
+    assert run_pipeline(pipeline, input_queue, [1, 2, 3], 2) == [2, 6]
+    assert pipeline.get_stats()["odd"]["dropped"] == 1
+
+
+def test_full_queue_holds_back_the_stage_before():
+    input_queue = queue.Queue()
+    released = threading.Event()
+    pipeline = Pipeline(input_queue, threading.Event(), queue_size=2)
+    pipeline.add_stage("response", lambda item: item)
+    pipeline.add_stage("playback", lambda item: item if released.wait(5) else None)
+
+    for item in range(10):
+        input_queue.put(item)
+    output_queue = queue.Queue()
+    pipeline.stages[-1].output_queue = output_queue
+    pipeline.start()
+    try:
+        time.sleep(0.3)
+        # playback holds one item, its queue two more, response one it can't hand over, the rest wait upstream
+        stats = pipeline.get_stats()
+        assert stats["response"]["processed"] == 4
+        assert stats["response"]["queue_depth"] == 6
+        assert stats["playback"]["queue_depth"] == 2
+
+        released.set()
+        assert [output_queue.get(timeout=5) for _ in range(10)] == list(range(10))
+    finally:
+        pipeline.stop_event.set()
+        pipeline.join()
@@ -0,0 +1,70 @@
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("selenium")
+from chat_fetchers import yt_chat_scraper  # noqa: E402
+from chat_fetchers.yt_chat_scraper import convert_timestamp, display_time_to_epoch  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset to pin the local timezone")
+
+
+@pytest.fixture(params=["America/New_York", "Asia/Kolkata", "UTC"])
+def local_tz(request, monkeypatch):
+    """Run the test with the process' local timezone set to each zone in turn."""
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    # The parse cache is keyed on the clock minute, not the zone
+    yt_chat_scraper._display_time_to_epoch.cache_clear()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+    yt_chat_scraper._display_time_to_epoch.cache_clear()
+
+
+# (local wall clock now, displayed time, local wall clock the message was sent at)
+CASES = [
+    # Midnight and 12 AM
+    ((2026, 10, 18, 0, 0, 30), "12:00 AM", (2026, 10, 18, 0, 0)),
+    ((2026, 10, 18, 0, 0, 30), "11:59 PM", (2026, 10, 17, 23, 59)),
+    ((2026, 10, 18, 0, 0, 30), "12:01 AM", (2026, 10, 18, 0, 1)),
+    # Noon and 12 PM
+    ((2026, 10, 18, 12, 0, 10), "12:00 PM", (2026, 10, 18, 12, 0)),
+    ((2026, 10, 18, 12, 0, 10), "11:59 AM", (2026, 10, 18, 11, 59)),
+    ((2026, 10, 18, 12, 0, 10), "12:30 PM", (2026, 10, 17, 12, 30)),
+    # Up to 5 minutes later than now is clock skew, any later is from yesterday
+    ((2026, 10, 18, 13, 5, 0), "1:05 PM", (2026, 10, 18, 13, 5)),
+    ((2026, 10, 18, 13, 5, 0), "1:06 PM", (2026, 10, 18, 13, 6)),
+    ((2026, 10, 18, 13, 5, 0), "1:10 PM", (2026, 10, 18, 13, 10)),
+    ((2026, 10, 18, 13, 5, 0), "1:11 PM", (2026, 10, 17, 13, 11)),
+    # 24 hour clock
+    ((2026, 10, 18, 13, 5, 0), "13:05", (2026, 10, 18, 13, 5)),
+    ((2026, 10, 18, 0, 10, 0), "23:50", (2026, 10, 17, 23, 50)),
+    ((2026, 10, 18, 0, 10, 0), "0:05", (2026, 10, 18, 0, 5)),
+    # Across the year boundary
+    ((2027, 1, 1, 0, 0, 20), "11:59 PM", (2026, 12, 31, 23, 59)),
+    ((2027, 1, 1, 0, 0, 20), "12:00 AM", (2027, 1, 1, 0, 0)),
+    # Newer Chrome versions put a narrow no-break space before AM/PM
+    ((2026, 10, 18, 13, 5, 0), "1:05\u202fPM", (2026, 10, 18, 13, 5)),
+]
+
+
+@pytest.mark.parametrize("now, displayed, expected", CASES)
+def test_display_time_to_epoch(local_tz, now, displayed, expected):
+    now = datetime(*now).timestamp()
+    assert display_time_to_epoch(displayed, now) == datetime(*expected).timestamp()
+
+
+def test_convert_timestamp_is_utc(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yt_chat_scraper._display_time_to_epoch.cache_clear()
+    try:
+        now = datetime(2026, 10, 18, 0, 0, 30).timestamp()
+        assert convert_timestamp("12:00 AM", now) == "2026-10-18T04:00:00Z"
+        assert convert_timestamp("11:59 PM", now) == "2026-10-18T03:59:00Z"
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        yt_chat_scraper._display_time_to_epoch.cache_clear()
@@ -0,0 +1,246 @@
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google_auth_oauthlib.flow")
+pytest.importorskip("googleapiclient.discovery")
+pytest.importorskip("pytz")
+
+from lib.yt_api import QUOTA_TIMEZONE, BroadcastCache, QuotaBudget, QuotaExceededError, YouTubeClient
+
+HOUR = 3600
+
+
+def pacific(*args):
+    """Epoch seconds for a wall clock time in the quota's timezone."""
+    return QUOTA_TIMEZONE.localize(datetime(*args)).timestamp()
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRequest:
+    def __init__(self, youtube, response):
+        self.youtube = youtube
+        self.response = response
+
+    def execute(self):
+        self.youtube.executed += 1
+        return self.response
+
+
+class FakeYouTube:
+    """Stands in for the googleapiclient resource, counts the requests that actually went out."""
+
+    def __init__(self):
+        self.executed = 0
+
+    def liveChatMessages(self):
+        return SimpleNamespace(list=lambda **kwargs: FakeRequest(self, {'items': [], 'pollingIntervalMillis': 5000}))
+
+    def liveBroadcasts(self):
+        return SimpleNamespace(list=lambda **kwargs: FakeRequest(self, {'items': [
+            {'id': "live", 'snippet': {'liveChatId': "chat"}, 'status': {'lifeCycleStatus': "live"}}]}))
+
+
+def make_client(budget, youtube=None):
+    config = SimpleNamespace(channel_id="channel", youtube_broadcast_cache_ttl=300)
+    return YouTubeClient(config, youtube=youtube or FakeYouTube(), quota=budget)
+
+
+def test_call_refused_when_it_would_exceed_the_limit():
+    budget = QuotaBudget(daily_limit=12, state_file=None, reserve=0)
+    youtube = FakeYouTube()
+    client = make_client(budget, youtube)
+
+    client.get_live_chat_messages("chat")
+    client.get_live_chat_messages("chat")
+    with pytest.raises(QuotaExceededError):
+        client.get_live_chat_messages("chat")
+    # The refused call never went out and wasn't charged
+    assert youtube.executed == 2
+    assert budget.used == 10
+
+    # A cheaper call still fits in what's left
+    assert client.get_live_chat_id() == "chat"
+    assert budget.remaining == 1
+
+
+def test_quota_resets_at_pacific_midnight():
+    clock = FakeClock(datetime(2026, 10, 18, 23, 59, 50, tzinfo=timezone.utc).timestamp())
+    budget = QuotaBudget(daily_limit=100, state_file=None, clock=clock)
+    budget.spend("liveChatMessages.list")
+    assert budget.date == "2026-10-18"
+
+    # Midnight UTC is 5 PM in Los Angeles, nothing resets
+    clock.now += 20
+    budget.spend("liveChatMessages.list")
+    assert budget.used == 10
+
+    clock.now = pacific(2026, 10, 18, 23, 59, 50)
+    assert budget.remaining == 90
+    clock.now += 20
+    assert budget.remaining == 100
+    assert budget.date == "2026-10-19"
+
+
+def test_quota_restored_after_restart(tmp_path):
+    state_file = str(tmp_path / "quota.json")
+    clock = FakeClock(pacific(2026, 10, 18, 12, 0))
+    budget = QuotaBudget(daily_limit=100, state_file=state_file, clock=clock)
+    budget.spend("liveChatMessages.list")
+    budget.spend("liveBroadcasts.list")
+
+    clock.now += HOUR
+    assert QuotaBudget(daily_limit=100, state_file=state_file, clock=clock).used == 6
+
+    # A restart the next day starts from 0
+    clock.now = pacific(2026, 10, 19, 0, 30)
+    assert QuotaBudget(daily_limit=100, state_file=state_file, clock=clock).used == 0
+
+
+def test_unreadable_state_file_starts_from_zero(tmp_path):
+    state_file = tmp_path / "quota.json"
+    state_file.write_text("{not json")
+    assert QuotaBudget(state_file=str(state_file)).used == 0
+
+
+def test_min_poll_interval():
+    clock = FakeClock(pacific(2026, 10, 18, 12, 0))
+    budget = QuotaBudget(daily_limit=10000, state_file=None, reserve=500, stream_duration=4 * HOUR, clock=clock)
+    # (10000 - 500) // 5 = 1900 polls over 4 hours
+    assert budget.min_poll_interval() == pytest.approx(4 * HOUR / 1900)
+
+    for _ in range(900):
+        budget.spend("liveChatMessages.list")
+    clock.now += 2 * HOUR
+    # (5500 - 500) // 5 = 1000 polls over the 2 hours left
+    assert budget.min_poll_interval() == pytest.approx(2 * HOUR / 1000)
+
+    # Down to the reserve: no polls left, wait out the stream
+    for _ in range(1000):
+        budget.spend("liveChatMessages.list")
+    assert budget.min_poll_interval() == pytest.approx(2 * HOUR)
+
+    clock.now += 3 * HOUR
+    assert budget.min_poll_interval() == 0
+
+
+def test_poll_interval_keeps_a_stream_within_budget():
+    clock = FakeClock(pacific(2026, 10, 18, 12, 0))
+    budget = QuotaBudget(daily_limit=10000, state_file=None, reserve=500, stream_duration=4 * HOUR, clock=clock)
+    client = make_client(budget)
+    while clock.now < budget.stream_end:
+        client.get_live_chat_messages("chat")
+        clock.now += max(budget.min_poll_interval(), 5.0)
+    assert budget.remaining >= 500
+
+
+class BlockingFetch:
+    """A fetch() that waits for release() before it returns (or raises) each result."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.released.wait(5)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def release(self):
+        self.released.set()
+
+
+def call_concurrently(function, count):
+    """Starts function on count threads, returns the threads and the lists their results and exceptions go to."""
+    results, exceptions = [], []
+
+    def call():
+        try:
+            results.append(function())
+        except Exception as e:
+            exceptions.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, exceptions
+
+
+def test_cold_cache_fetches_once_for_concurrent_callers():
+    fetch = BlockingFetch("broadcast")
+    cache = BroadcastCache(fetch, ttl=300)
+    threads, results, exceptions = call_concurrently(cache.get, 10)
+    assert fetch.started.wait(5)
+    time.sleep(0.1)  # Let the other callers queue up behind the fetch
+    fetch.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["broadcast"] * 10
+    assert exceptions == []
+    assert fetch.calls == 1
+
+
+def test_stale_value_served_while_refreshing():
+    clock = FakeClock(0)
+    fetch = BlockingFetch("first", "second")
+    cache = BroadcastCache(fetch, ttl=300, clock=clock)
+    fetch.release()
+    assert cache.get() == "first"
+
+    fetch.released.clear()
+    fetch.started.clear()
+    clock.now += 301
+    # The refresh runs in the background, callers don't wait for it
+    assert cache.get() == "first"
+    assert fetch.started.wait(5)
+    assert cache.get() == "first"
+
+    fetch.release()
+    deadline = time.monotonic() + 5
+    while cache.fetches < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get() == "second"
+    assert fetch.calls == 2
+
+
+def test_fetch_error_raised_to_waiting_callers():
+    fetch = BlockingFetch(RuntimeError("quota exceeded"), "broadcast")
+    cache = BroadcastCache(fetch, ttl=300)
+    threads, results, exceptions = call_concurrently(cache.get, 5)
+    assert fetch.started.wait(5)
+    time.sleep(0.1)
+    fetch.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == []
+    assert [str(e) for e in exceptions] == ["quota exceeded"] * 5
+    assert fetch.calls == 1
+    # The next caller tries again
+    assert cache.get() == "broadcast"
+
+
+def test_client_lookups_share_one_broadcast_fetch():
+    youtube = FakeYouTube()
+    client = make_client(QuotaBudget(state_file=None), youtube)
+    assert client.get_live_id() == "live"
+    assert client.get_live_chat_id() == "chat"
+    assert client.get_broadcast_status() == "live"
+    assert youtube.executed == 1